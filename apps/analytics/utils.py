@@ -1,4 +1,6 @@
-from django.db.models import Sum, F, Q, DecimalField
+from uuid import UUID
+from django.db import connection
+from django.db.models import Sum, Q, DecimalField
 from django.db.models.functions import Coalesce
 from djmoney.money import Money
 from ..inventory.models import InventoryItem, Inventory, InventoryHistory
@@ -26,55 +28,25 @@ def calculate_inventory_turnover(user, start_date=None, end_date=None, currency=
         Q(created_by=user) | Q(is_default=True)
     )
 
-    # Calculate consumption from orders in bulk
+    # Calculate consumption from the ingredient snapshots on completed order lines
+    completed_lines = OrderRecipe.objects.filter(
+        order__created_by=user, order__status="completed"
+    )
+
     # Consumption after start_date
     start_consumption = {}
     if start_date:
-        consumption_data = (
-            OrderRecipe.objects.filter(
-                order__created_by=user,
-                order__status="completed",
-                order__created_at__gte=start_date,
-            )
-            .values("recipe__ingredients__inventory_item_id")
-            .annotate(
-                total_consumed=Coalesce(
-                    Sum(F("recipe__ingredients__quantity") * F("quantity")),
-                    0,
-                    output_field=DecimalField(),
-                )
-            )
+        start_consumption, _ = _consumption_by_item(
+            completed_lines.filter(order__created_at__gte=start_date)
         )
 
-        start_consumption = {
-            item["recipe__ingredients__inventory_item_id"]: item["total_consumed"]
-            for item in consumption_data
-        }
-
     # Calculate consumption after end_date
     end_consumption = {}
     if end_date:
-        consumption_data = (
-            OrderRecipe.objects.filter(
-                order__created_by=user,
-                order__status="completed",
-                order__created_at__gte=end_date,
-            )
-            .values("recipe__ingredients__inventory_item_id")
-            .annotate(
-                total_consumed=Coalesce(
-                    Sum(F("recipe__ingredients__quantity") * F("quantity")),
-                    0,
-                    output_field=DecimalField(),
-                )
-            )
+        end_consumption, _ = _consumption_by_item(
+            completed_lines.filter(order__created_at__gte=end_date)
         )
 
-        end_consumption = {
-            item["recipe__ingredients__inventory_item_id"]: item["total_consumed"]
-            for item in consumption_data
-        }
-
     # Calculate inventory additions in bulk
     start_additions = {}
     if start_date:
@@ -111,28 +83,12 @@ def calculate_inventory_turnover(user, start_date=None, end_date=None, currency=
     # Calculate COGS for the period in bulk
     cogs_data = {}
     if start_date and end_date:
-        cogs_calculations = (
-            OrderRecipe.objects.filter(
-                order__created_by=user,
-                order__status="completed",
-                order__created_at__gte=start_date,
-                order__created_at__lte=end_date,
-            )
-            .values("recipe__ingredients__inventory_item_id")
-            .annotate(
-                total_cogs=Coalesce(
-                    Sum(F("recipe__ingredients__cost") * F("quantity")),
-                    0,
-                    output_field=DecimalField(),
-                )
+        _, cogs_data = _consumption_by_item(
+            completed_lines.filter(
+                order__created_at__gte=start_date, order__created_at__lte=end_date
             )
         )
 
-        cogs_data = {
-            item["recipe__ingredients__inventory_item_id"]: item["total_cogs"]
-            for item in cogs_calculations
-        }
-
     # Calculate turnover for all items
     turnover_results = []
 
@@ -175,3 +131,30 @@ def calculate_inventory_turnover(user, start_date=None, end_date=None, currency=
         )
 
     return turnover_results
+
+
+def _consumption_by_item(order_recipes):
+    """
+    Total quantity and cost used per inventory item across the order lines,
+    read from the ingredient breakdown snapshotted when each line was created.
+    The breakdown is expanded and summed by the database, one row per item.
+    """
+    lines_sql, params = (
+        order_recipes.order_by().values("quantity", "cost_breakdown").query
+    ).sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT item.key,
+                   SUM((item.value ->> 0)::numeric * line.quantity),
+                   SUM((item.value ->> 1)::numeric * line.quantity)
+            FROM ({lines_sql}) AS line
+            CROSS JOIN LATERAL jsonb_each(line.cost_breakdown -> 'items') AS item
+            GROUP BY item.key
+            """,
+            params,
+        )
+        rows = cursor.fetchall()
+    consumed = {UUID(item_id): quantity for item_id, quantity, _ in rows}
+    cost = {UUID(item_id): item_cost for item_id, _, item_cost in rows}
+    return consumed, cost
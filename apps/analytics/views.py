@@ -7,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .utils import calculate_inventory_turnover
+from ..dashboard.services import DailyOrderStatsService
 from ..dashboard.views import MoneyAggregate
 from ..orders.models import Order
 from ..users.utils import get_user_preferrence_from_cache
@@ -18,7 +19,7 @@ class AnalyticsView(APIView):
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        currency = get_user_preferrence_from_cache(user, "currency", "USD")
+        currency = get_user_preferrence_from_cache(user.id, "currency", "USD")
 
         # Fetch fields filterable by date
         # Get start_date and end_date from kwargs (if provided)
@@ -53,6 +54,12 @@ class AnalyticsView(APIView):
                     "Invalid end_date format. Required format is YYYY-MM-DD."
                 )
 
+        bucket = request.query_params.get("bucket", "day")
+        if bucket not in DailyOrderStatsService.BUCKETS:
+            raise ValidationError(
+                {"bucket": f"Choose one of {', '.join(DailyOrderStatsService.BUCKETS)}."}
+            )
+
         completed_orders = Order.objects.filter(
                 created_by=user, status="completed", created_at__gte=start_date, created_at__lte=end_date
             ).prefetch_related("order_recipes")
@@ -66,8 +73,13 @@ class AnalyticsView(APIView):
                 total_customers=Count("customer", distinct=True),
             )
 
-            # List of (created_at, profit) tuples
-            profit_stats = completed_orders.values_list("created_at", "profit")
+            # Profit per day, week or month from the daily rollup
+            profit_stats = [
+                {"period": row["period"], "profit": row["profit"]}
+                for row in DailyOrderStatsService.chart(
+                    user, start_date, end_date, bucket
+                )
+            ]
 
             revenue_by_recipe_category = completed_orders.values(
                 "order_recipes__recipe__category__name"
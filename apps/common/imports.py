@@ -0,0 +1,40 @@
+import csv
+import os
+from contextlib import contextmanager
+from rest_framework.exceptions import ValidationError
+
+
+def import_source(request, body_formats, upload_formats=None, upload_default=None):
+    """
+    Work out what a bulk import endpoint should read.
+
+    `body_formats` maps accepted request content types to a format name.
+    A multipart upload named "file" is matched on its extension through
+    `upload_formats` ({".csv": "csv"}), falling back to `upload_default`.
+
+    Returns (format, lines), where lines iterates the body or the upload
+    line by line, or None when the content type is not accepted.
+    """
+    content_type = request.content_type.split(";")[0].strip().lower()
+
+    if content_type == "multipart/form-data":
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "No file was uploaded."})
+        extension = os.path.splitext(upload.name)[1].lower()
+        return (upload_formats or {}).get(extension, upload_default), upload
+
+    if content_type not in body_formats:
+        return None
+    # DRF drops a body sent without a Content-Length, as chunked uploads are,
+    # so read the underlying Django request instead
+    return body_formats[content_type], request._request
+
+
+@contextmanager
+def import_errors():
+    """Report an upload that cannot be decoded or parsed as a 400"""
+    try:
+        yield
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValidationError({"error": f"The upload could not be read: {e}"})
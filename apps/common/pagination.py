@@ -0,0 +1,150 @@
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite key.
+
+    Each page resumes strictly after the key of the last row served, so deep
+    pages cost the same as the first one when an index matches `ordering`.
+    NULLs sort as the largest value, like PostgreSQL's default ordering.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = bool(self.cursor and self.cursor["reverse"])
+
+        # (field name, descending) with the direction flipped for "previous" pages
+        keys = [
+            (field.lstrip("-"), field.startswith("-") != self.reverse)
+            for field in self.ordering
+        ]
+        queryset = queryset.order_by(
+            *[
+                F(name).desc(nulls_first=True)
+                if descending
+                else F(name).asc(nulls_last=True)
+                for name, descending in keys
+            ]
+        )
+        if self.cursor:
+            queryset = queryset.filter(self._after(keys, self.cursor["position"]))
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if not self.page or (not self.reverse and not self.has_more):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.page or (self.reverse and not self.has_more):
+            return None
+        if not self.reverse and self.cursor is None:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            if value is not None:
+                value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+            position.append(value)
+        token = base64.urlsafe_b64encode(
+            json.dumps({"p": position, "r": reverse}).encode()
+        ).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()))
+            raw_position = data["p"]
+            if len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = [
+                None
+                if value is None
+                else model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, raw_position)
+            ]
+            return {"position": position, "reverse": bool(data.get("r"))}
+        except (
+            binascii.Error,
+            KeyError,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _after(keys, position):
+        """Rows strictly after `position` in the (possibly reversed) key order"""
+        condition = Q(pk__in=[])
+        prefix_equal = Q()
+        for (name, descending), value in zip(keys, position):
+            if value is None:
+                # NULL is the largest value: first when descending, last when ascending
+                beyond = Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                beyond = Q(**{f"{name}__lt" if descending else f"{name}__gt": value})
+                if not descending:
+                    beyond |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= prefix_equal & beyond
+            prefix_equal &= same
+        # The OR chain alone gives no range to start an index scan from, so
+        # also bound the first key: it can only be at or beyond the cursor's
+        (name, descending), value = keys[0], position[0]
+        if value is None:
+            leading = Q() if descending else Q(**{f"{name}__isnull": True})
+        elif descending:
+            leading = Q(**{f"{name}__lte": value})
+        else:
+            leading = Q(**{f"{name}__gte": value}) | Q(**{f"{name}__isnull": True})
+        return leading & condition
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            }
+        ]
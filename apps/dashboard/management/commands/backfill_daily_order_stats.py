@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from ...services import DailyOrderStatsService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily order rollup from existing orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", action="append", help="Only rebuild these user ids (repeatable)"
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        user_ids = options["user"] or list(
+            User.objects.filter(orders__isnull=False)
+            .distinct()
+            .values_list("id", flat=True)
+        )
+
+        days = 0
+        batch_size = options["batch_size"]
+        for start in range(0, len(user_ids), batch_size):
+            days += DailyOrderStatsService.rebuild(user_ids[start : start + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {days} day(s) for {len(user_ids)} user(s).")
+        )
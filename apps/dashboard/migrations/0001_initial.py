@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-16 22:05
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('is_active', models.BooleanField(default=True)),
+                ('day', models.DateField()),
+                ('completed_count', models.IntegerField(default=0)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('profit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('ingredient_cost', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('labour_cost', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('packaging_cost', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('overhead_cost', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_order_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Order Stats',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='dashboard_daily_stats_unique_user_day')],
+            },
+        ),
+    ]
@@ -1,3 +1,47 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.db import models
+from ..common.models import BaseModel
 
-# Create your models here.
+User = get_user_model()
+
+
+class DailyOrderStats(BaseModel):
+    """
+    Completed and cancelled order totals per user and day the order was
+    placed, kept in step by DailyOrderStatsService so charts read at most
+    one row per day instead of every order.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="daily_order_stats"
+    )
+    day = models.DateField()
+    completed_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal(0.00))
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal(0.00))
+    ingredient_cost = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal(0.00)
+    )
+    labour_cost = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal(0.00)
+    )
+    packaging_cost = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal(0.00)
+    )
+    overhead_cost = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal(0.00)
+    )
+
+    class Meta:  # type: ignore
+        verbose_name_plural = "Daily Order Stats"
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "day"], name="dashboard_daily_stats_unique_user_day"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day}"
@@ -0,0 +1,155 @@
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Sum,
+)
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Trunc, TruncDate
+from ..orders.models import Order, OrderRecipe
+from .models import DailyOrderStats
+
+# DailyOrderStats field -> component of the cost breakdown stored on OrderRecipe
+COST_COMPONENTS = {
+    "ingredient_cost": "ingredients",
+    "labour_cost": "labour",
+    "packaging_cost": "packaging",
+    "overhead_cost": "overhead",
+}
+
+
+def snapshot_cost(component):
+    """Line cost of one component of the cost breakdown stored on OrderRecipe"""
+    return ExpressionWrapper(
+        Cast(
+            KT(f"cost_breakdown__{component}"),
+            DecimalField(max_digits=10, decimal_places=2),
+        )
+        * F("quantity"),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+class DailyOrderStatsService:
+    """
+    Keeps DailyOrderStats in step with order completions and cancellations
+    and serves chart series from it, bucketed by day, week or month.
+    """
+
+    BUCKETS = ("day", "week", "month")
+
+    @classmethod
+    def record_completed(cls, order_ids):
+        """Add freshly completed orders to their days"""
+        cls._apply(cls._completed_totals(Order.objects.filter(pk__in=order_ids)))
+
+    @classmethod
+    def record_cancelled(cls, order_ids):
+        """Count freshly cancelled orders on their days"""
+        cls._apply(cls._cancelled_totals(Order.objects.filter(pk__in=order_ids)))
+
+    @classmethod
+    def rebuild(cls, user_ids):
+        """Recompute every day for the users from their orders"""
+        orders = Order.objects.filter(created_by__in=user_ids)
+        totals = cls._completed_totals(orders.filter(status="completed"))
+        for key, values in cls._cancelled_totals(
+            orders.filter(status="cancelled")
+        ).items():
+            totals.setdefault(key, {}).update(values)
+
+        with transaction.atomic():
+            DailyOrderStats.objects.filter(user__in=user_ids).delete()
+            DailyOrderStats.objects.bulk_create(
+                [
+                    DailyOrderStats(user_id=user_id, day=day, **values)
+                    for (user_id, day), values in totals.items()
+                ],
+                batch_size=1000,
+            )
+        return len(totals)
+
+    @classmethod
+    def chart(cls, user, start_date=None, end_date=None, bucket="day"):
+        """Completed order count, revenue and profit per bucket, oldest first"""
+        rows = DailyOrderStats.objects.filter(user=user)
+        if start_date:
+            rows = rows.filter(day__gte=start_date)
+        if end_date:
+            rows = rows.filter(day__lte=end_date)
+        return list(
+            rows.annotate(period=Trunc("day", bucket))
+            .values("period")
+            .annotate(
+                order_count=Sum("completed_count"),
+                total_value=Sum("revenue"),
+                profit=Sum("profit"),
+            )
+            .filter(order_count__gt=0)
+            .order_by("period")
+        )
+
+    @staticmethod
+    def _completed_totals(orders):
+        """{(user_id, day): totals} for the orders and their line cost snapshots"""
+        totals = {}
+        for row in (
+            orders.annotate(day=TruncDate("created_at"))
+            .values("created_by_id", "day")
+            .annotate(
+                completed_count=Count("id"),
+                revenue=Sum("total_value"),
+                profit=Sum("profit"),
+            )
+        ):
+            totals[(row.pop("created_by_id"), row.pop("day"))] = row
+
+        # Lines are summed separately so joining them does not repeat order totals
+        for row in (
+            OrderRecipe.objects.filter(order__in=orders)
+            .annotate(day=TruncDate("order__created_at"))
+            .values("order__created_by_id", "day")
+            .annotate(
+                **{
+                    field: Sum(snapshot_cost(component))
+                    for field, component in COST_COMPONENTS.items()
+                }
+            )
+        ):
+            key = (row.pop("order__created_by_id"), row.pop("day"))
+            totals.setdefault(key, {}).update(
+                {field: value for field, value in row.items() if value is not None}
+            )
+        return totals
+
+    @staticmethod
+    def _cancelled_totals(orders):
+        return {
+            (row["created_by_id"], row["day"]): {
+                "cancelled_count": row["cancelled_count"]
+            }
+            for row in orders.annotate(day=TruncDate("created_at"))
+            .values("created_by_id", "day")
+            .annotate(cancelled_count=Count("id"))
+        }
+
+    @staticmethod
+    def _apply(totals):
+        """Add the totals onto the matching rows, creating missing ones first"""
+        if not totals:
+            return
+        with transaction.atomic():
+            DailyOrderStats.objects.bulk_create(
+                [DailyOrderStats(user_id=user_id, day=day) for user_id, day in totals],
+                ignore_conflicts=True,
+            )
+            for (user_id, day), values in totals.items():
+                DailyOrderStats.objects.filter(user_id=user_id, day=day).update(
+                    **{
+                        field: F(field) + value
+                        for field, value in values.items()
+                        if value is not None
+                    }
+                )
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from redis.exceptions import LockError
+
+
+def get_dashboard_generation_key(user_id):
+    return f"dashboard_generation_{user_id}"
+
+
+def get_dashboard_generation(user_id):
+    """
+    The user's current dashboard generation. Every cached payload is keyed by
+    it, so bumping it retires all of the user's entries at once.
+    """
+    key = get_dashboard_generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def invalidate_dashboard_cache(user_id):
+    """
+    Retire the user's cached dashboards once the current transaction commits,
+    so a dashboard rebuilt before then cannot be stored under the new generation.
+    """
+
+    def bump():
+        key = get_dashboard_generation_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No generation yet, so nothing cached needs retiring
+            cache.add(key, 1, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def get_dashboard_cache_key(user_id, params):
+    generation = get_dashboard_generation(user_id)
+    return f"dashboard_{user_id}_{generation}_" + "_".join(str(p) for p in params)
+
+
+def get_or_build_dashboard(user_id, params, build):
+    """
+    Return the cached dashboard payload for the request parameters, building
+    it with `build()` on a miss.
+    Only the worker holding the entry's lock builds it; the others wait for
+    the lock and then read what it stored.
+    """
+    key = get_dashboard_cache_key(user_id, params)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock = cache.lock(
+        f"{key}_lock",
+        timeout=settings.DASHBOARD_CACHE_LOCK_TIMEOUT,
+        blocking_timeout=settings.DASHBOARD_CACHE_LOCK_TIMEOUT,
+    )
+    acquired = lock.acquire(blocking=True)
+    try:
+        if acquired:
+            payload = cache.get(key)
+            if payload is not None:
+                return payload
+        # Build anyway if the lock holder took too long
+        payload = build()
+        if acquired:
+            cache.set(key, payload, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+        return payload
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockError:
+                # The lock expired while building and may belong to another worker now
+                pass
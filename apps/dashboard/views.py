@@ -7,12 +7,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from rest_framework.exceptions import ValidationError as DRFValidationError
 from ..orders.models import Order, OrderRecipe
 from ..orders.serializers import OrderSerializer
 from ..inventory.models import Inventory
 from ..notifications.models import Notification
 from ..users.utils import get_user_preferrence_from_cache
-from..notifications.utils import check_upcoming_deliveries
+from .services import DailyOrderStatsService, snapshot_cost
+from .utils import get_or_build_dashboard
 
 
 class MoneyAggregate(Aggregate):
@@ -37,14 +39,6 @@ class DashboardView(APIView):
     permission_classes=[IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-
-        # Check upcoming deliveries
-        if not request.session.get("deliveries_checked_today"):
-            check_upcoming_deliveries()
-            request.session["deliveries_checked_today"] = True
-            request.session.set_expiry(86400) # 24 hours
-            
-
         # Fetch fields filterable by date
         # Get start_date and end_date from kwargs (if provided)
         start_date_str = request.query_params.get("start_date")
@@ -78,8 +72,22 @@ class DashboardView(APIView):
                     "Invalid end_date format. Required format is YYYY-MM-DD."
                 )
 
-        currency = get_user_preferrence_from_cache(request.user, "currency", "USD")
+        bucket = request.query_params.get("bucket", "day")
+        if bucket not in DailyOrderStatsService.BUCKETS:
+            raise DRFValidationError(
+                {"bucket": f"Choose one of {', '.join(DailyOrderStatsService.BUCKETS)}."}
+            )
 
+        currency = get_user_preferrence_from_cache(request.user.id, "currency", "USD")
+
+        payload = get_or_build_dashboard(
+            request.user.id,
+            (start_date, end_date, bucket, currency),
+            lambda: self.build_payload(request, start_date, end_date, bucket, currency),
+        )
+        return Response(payload, status=status.HTTP_200_OK)
+
+    def build_payload(self, request, start_date, end_date, bucket, currency):
         completed_orders = Order.objects.filter(
             created_by=self.request.user, status="completed"
         ).prefetch_related("order_recipes")
@@ -100,19 +108,21 @@ class DashboardView(APIView):
                 created_at__lte=end_date
             )
 
-        chart_data = completed_orders.values_list(
-            "created_at", "total_value", "profit"
-        )  # List of (created_at, total_value, profit) tuples
+        # Completed orders per day, week or month from the daily rollup
+        chart_data = DailyOrderStatsService.chart(
+            request.user, start_date, end_date, bucket
+        )
 
         # fetch non-filterable fields
 
+        # Costs come from the snapshots taken when each line was created
         recipe_stats = OrderRecipe.objects.filter(order__in=completed_orders).aggregate(
             ingredient_cost=MoneyAggregate(
-                "recipe__inventory_items_cost", currency=currency
+                snapshot_cost("ingredients"), currency=currency
             ),
-            overhead_cost=MoneyAggregate("recipe__overhead_cost", currency=currency),
-            labour_cost=MoneyAggregate("recipe__labour_cost", currency=currency),
-            packaging_cost=MoneyAggregate("recipe__packaging_cost", currency=currency),
+            overhead_cost=MoneyAggregate(snapshot_cost("overhead"), currency=currency),
+            labour_cost=MoneyAggregate(snapshot_cost("labour"), currency=currency),
+            packaging_cost=MoneyAggregate(snapshot_cost("packaging"), currency=currency),
         )
 
         # Combine results
@@ -128,15 +138,13 @@ class DashboardView(APIView):
         ).data
 
         results["low_stock"] = Inventory.objects.filter(
-            quantity__lt=F("reorder_level")
+            created_by=self.request.user, quantity__lt=F("reorder_level")
         ).count()
         results["active_orders"] = pending_orders.count()
 
-        return Response(
-            {
-                "aggregates": results,
-                "chart_data": list(chart_data),
-                "upcoming_orders": upcoming_orders,
-            },
-            status=status.HTTP_200_OK,
-        )
+        return {
+            "aggregates": results,
+            "chart_data": chart_data,
+            "upcoming_orders": list(upcoming_orders),
+        }
+
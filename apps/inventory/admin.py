@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.db.models import F
 from .models import InventoryItem, Supplier, Inventory, InventoryHistory
+from .services import InventorySummaryService
+from ..dashboard.utils import invalidate_dashboard_cache
 
 
 @admin.register(InventoryItem)
@@ -70,6 +73,30 @@ class InventoryAdmin(admin.ModelAdmin):
     is_below_reorder_level.boolean = True  # type: ignore
     is_below_reorder_level.short_description = "Below Reorder Level"  # type: ignore
 
+    # Admin edits can move stock between users, so rebuild rather than track deltas
+    def save_model(self, request, obj, form, change):
+        previous_owner = form.initial.get("created_by") if change else None
+        if change:
+            obj.version = F("version") + 1
+        super().save_model(request, obj, form, change)
+        InventorySummaryService.rebuild(obj.created_by)
+        invalidate_dashboard_cache(obj.created_by_id)
+        if previous_owner and previous_owner != obj.created_by_id:
+            InventorySummaryService.rebuild(previous_owner)
+            invalidate_dashboard_cache(previous_owner)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        InventorySummaryService.rebuild(obj.created_by)
+        invalidate_dashboard_cache(obj.created_by_id)
+
+    def delete_queryset(self, request, queryset):
+        owners = set(queryset.values_list("created_by", flat=True))
+        super().delete_queryset(request, queryset)
+        for owner in owners:
+            InventorySummaryService.rebuild(owner)
+            invalidate_dashboard_cache(owner)
+
 
 @admin.register(InventoryHistory)
 class InventoryHistoryAdmin(admin.ModelAdmin):
@@ -101,3 +128,7 @@ class InventoryHistoryAdmin(admin.ModelAdmin):
             },
         ),
     )
+
+    def save_model(self, request, obj, form, change):
+        obj.calculate_cost()
+        super().save_model(request, obj, form, change)
@@ -0,0 +1,167 @@
+import queue
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from ...models import Inventory, InventoryItem
+from ...services import InventorySummaryService, InventoryUpdateService, StockConflict
+from ....customers.models import Customer
+from ....jobs.models import Job
+from ....orders.models import Order, OrderRecipe
+from ....orders.services import OrderNumberService, OrderService
+from ....recipes.models import Recipe, RecipeInventory
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent order completions and stock receipts at the same items "
+        "and check that no stock update is lost. Uses throwaway data that is "
+        "removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--orders", type=int, default=200)
+        parser.add_argument("--receipts", type=int, default=200)
+        parser.add_argument("--items", type=int, default=5)
+
+    def handle(self, *args, **options):
+        user = User.objects.create(
+            email=f"stock-benchmark-{uuid.uuid4().hex[:12]}@example.com",
+            first_name="Stock",
+            last_name="Benchmark",
+        )
+        try:
+            self.run(user, options)
+        finally:
+            # Reorder checks are keyed by the user id, cost recalcs by "<user id>:..."
+            Job.objects.filter(
+                Q(key=str(user.id)) | Q(key__startswith=f"{user.id}:")
+            ).delete()
+            user.delete()
+
+    def run(self, user, options):
+        items, orders = self.create_data(user, options)
+        initial = Decimal(options["orders"])
+
+        tasks = queue.Queue()
+        operations = [("complete", order) for order in orders]
+        operations += [("receive", None)] * options["receipts"]
+        random.shuffle(operations)
+        for operation in operations:
+            tasks.put(operation)
+
+        counts = {"complete": 0, "receive": 0, "conflict": 0, "error": 0}
+        lock = threading.Lock()
+        entries = [
+            {"inventory_item_id": item.id, "quantity": Decimal(1), "cost_price": 1}
+            for item in items
+        ]
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        operation, order = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        if operation == "complete":
+                            OrderService.complete_order(order, user)
+                        else:
+                            InventoryUpdateService.process_inventory_updates(
+                                user, entries
+                            )
+                        outcome = operation
+                    except StockConflict:
+                        outcome = "conflict"
+                    except Exception as e:
+                        self.stderr.write(f"{operation} failed: {e}")
+                        outcome = "error"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options["workers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{len(operations)} operations on {len(items)} items with "
+            f"{options['workers']} workers in {elapsed:.2f}s "
+            f"({len(operations) / elapsed:.0f} ops/s): "
+            f"{counts['complete']} completions, {counts['receive']} receipts, "
+            f"{counts['conflict']} gave up after retries, {counts['error']} errors"
+        )
+
+        expected_quantity = initial + counts["receive"] - counts["complete"]
+        expected_version = 1 + counts["receive"] + counts["complete"]
+        problems = []
+        for row in Inventory.objects.filter(created_by=user):
+            if row.quantity != expected_quantity or row.version != expected_version:
+                problems.append(
+                    f"{row.inventory_item_id}: quantity {row.quantity} "
+                    f"(expected {expected_quantity}), version {row.version} "
+                    f"(expected {expected_version})"
+                )
+
+        summary = InventorySummaryService.get_summary(user).as_totals()
+        scanned = InventorySummaryService.aggregate(
+            Inventory.objects.filter(created_by=user, is_active=True)
+        )
+        if summary != scanned:
+            problems.append(f"Summary {summary} does not match stock {scanned}")
+
+        if problems or counts["error"]:
+            raise CommandError("Lost stock updates:\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("No lost updates."))
+
+    def create_data(self, user, options):
+        suffix = uuid.uuid4().hex[:8]
+        items = InventoryItem.objects.bulk_create(
+            [
+                InventoryItem(name=f"benchmark-{suffix}-{i}", created_by=user)
+                for i in range(options["items"])
+            ]
+        )
+        # Enough stock that every order can complete without any receipts
+        InventoryUpdateService.process_inventory_updates(
+            user,
+            [
+                {"inventory_item_id": item.id, "quantity": Decimal(options["orders"])}
+                for item in items
+            ],
+        )
+
+        recipe = Recipe.objects.create(name=f"benchmark-{suffix}", created_by=user)
+        RecipeInventory.objects.bulk_create(
+            [
+                RecipeInventory(recipe=recipe, inventory_item=item, quantity=1)
+                for item in items
+            ]
+        )
+        customer = Customer.objects.create(
+            first_name="Stock", last_name="Benchmark", contact="0", created_by=user
+        )
+        orders = Order.objects.bulk_create(
+            [
+                Order(order_no=order_no, customer=customer, created_by=user)
+                for order_no in OrderNumberService.allocate(options["orders"])
+            ]
+        )
+        OrderRecipe.objects.bulk_create(
+            [OrderRecipe(order=order, recipe=recipe, quantity=1) for order in orders]
+        )
+        return items, orders
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-16 20:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_alter_inventoryhistory_cost_per_unit_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryhistory',
+            index=models.Index(fields=['created_by', 'inventory_item', 'incident_date', 'created_at'], name='inventory_i_created_a763a9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryhistory',
+            index=models.Index(fields=['created_by', 'incident_date', 'created_at'], name='inventory_i_created_02592f_idx'),
+        ),
+    ]
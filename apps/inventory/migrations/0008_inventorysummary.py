@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-16 20:56
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_inventoryhistory_inventory_i_created_a763a9_idx_and_more'),
+        ('users', '0007_alter_userpreferences_profit_margin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('is_active', models.BooleanField(default=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('below_reorder_count', models.IntegerField(default=0)),
+                ('above_reorder_count', models.IntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'Inventory Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-16 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_inventorysummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every stock change'),
+        ),
+    ]
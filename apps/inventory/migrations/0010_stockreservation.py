@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-16 21:40
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def reserve_pending_orders(apps, schema_editor):
+    """Reserve stock for the orders that are already pending"""
+    StockReservation = apps.get_model("inventory", "StockReservation")
+    RecipeInventory = apps.get_model("recipes", "RecipeInventory")
+
+    rows = (
+        RecipeInventory.objects.filter(recipe__order_recipes__order__status="pending")
+        .values(
+            "recipe__order_recipes__order_id",
+            "recipe__order_recipes__order__created_by_id",
+            "inventory_item_id",
+        )
+        .annotate(total=Sum(F("quantity") * F("recipe__order_recipes__quantity")))
+    )
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                order_id=row["recipe__order_recipes__order_id"],
+                created_by_id=row["recipe__order_recipes__order__created_by_id"],
+                inventory_item_id=row["inventory_item_id"],
+                quantity=row["total"],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_inventory_version'),
+        ('orders', '0005_orderrecipe_price_snapshot'),
+        ('recipes', '0010_alter_recipe_options_alter_recipe_name_and_more'),
+        ('users', '0007_alter_userpreferences_profit_margin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('is_active', models.BooleanField(default=True)),
+                ('quantity', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to=settings.AUTH_USER_MODEL)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.inventoryitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', 'inventory_item'], name='inventory_reservation_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'inventory_item'), name='inventory_reservation_unique_order_item')],
+            },
+        ),
+        migrations.RunPython(reserve_pending_orders, migrations.RunPython.noop),
+    ]
@@ -75,6 +75,9 @@ class Inventory(BaseModel):
         decimal_places=2,
         default=Decimal(0.00),
     )
+    version = models.PositiveIntegerField(
+        default=0, help_text="Incremented on every stock change"
+    )
 
     class Meta:  # type: ignore
         verbose_name_plural = "Inventory"
@@ -105,6 +108,83 @@ class Inventory(BaseModel):
         return str(self.pk)
 
 
+class InventorySummary(BaseModel):
+    """
+    Per-user stock totals kept in step with Inventory by InventorySummaryService,
+    so listing stock does not have to aggregate every row.
+    """
+
+    id = None
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="inventory_summary",
+        primary_key=True,
+    )
+    below_reorder_count = models.IntegerField(default=0)
+    above_reorder_count = models.IntegerField(default=0)
+    total_value = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal(0.00),
+    )
+
+    class Meta:  # type: ignore
+        verbose_name_plural = "Inventory Summaries"
+
+    def __str__(self):
+        return str(self.pk)
+
+    def as_totals(self):
+        """The summary in the shape returned alongside the inventory list"""
+        return {
+            "total_count_below_reorder": self.below_reorder_count,
+            "total_count_above_reorder": self.above_reorder_count,
+            "total_value": self.total_value,
+        }
+
+
+class StockReservation(BaseModel):
+    """
+    Stock set aside for a pending order, one row per order and item.
+    Kept in step with orders as they are created, edited, cancelled and
+    completed, so available stock never has to be worked out from orders.
+    """
+
+    order = models.ForeignKey(
+        "orders.Order", on_delete=models.CASCADE, related_name="reservations"
+    )
+    inventory_item = models.ForeignKey(
+        InventoryItem, on_delete=models.CASCADE, related_name="reservations"
+    )
+    quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal(0.00),
+        validators=[MinValueValidator(0)],
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="stock_reservations"
+    )
+
+    class Meta:  # type: ignore
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "inventory_item"],
+                name="inventory_reservation_unique_order_item",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["created_by", "inventory_item"],
+                name="inventory_reservation_user_idx",
+            )
+        ]
+
+    def __str__(self):
+        return str(self.pk)
+
+
 class InventoryHistory(BaseModel):
     inventory_item = models.ForeignKey(
         InventoryItem,
@@ -147,11 +227,27 @@ class InventoryHistory(BaseModel):
 
     class Meta:  # type: ignore
         verbose_name_plural = "Inventory History"
+        indexes = [
+            models.Index(
+                fields=["created_by", "inventory_item", "incident_date", "created_at"]
+            ),
+            models.Index(fields=["created_by", "incident_date", "created_at"]),
+        ]
 
     def __str__(self):
         return str(self.pk)
 
+    @staticmethod
+    def unit_cost(cost_price, quantity):
+        """Cost per unit of a stock movement, rounded to the stored precision"""
+        quantity = Decimal(str(quantity or 0))
+        if quantity <= 0:
+            return Decimal("0.00")
+        return (Decimal(str(cost_price or 0)) / quantity).quantize(Decimal("0.01"))
+
     def calculate_cost(self):
-        if self.quantity > 0:
-            self.cost_per_unit = self.cost_price / self.quantity
-            self.save()
+        """
+        Recompute cost_per_unit for a single row edited in the admin.
+        Bulk inserts set it up front in InventoryUpdateService.
+        """
+        self.cost_per_unit = self.unit_cost(self.cost_price, self.quantity)
@@ -0,0 +1,10 @@
+from ..common.pagination import KeysetPagination
+
+
+class InventoryHistoryPagination(KeysetPagination):
+    """
+    Newest movements first, keyed on (incident_date, created_at, id).
+    Backed by the InventoryHistory (created_by, ..., incident_date, created_at) indexes.
+    """
+
+    ordering = ("-incident_date", "-created_at", "-id")
@@ -1,8 +1,10 @@
+from decimal import Decimal
 from django.db.models import Q
+from django.utils import timezone
 from rest_framework import serializers
 from djmoney.money import Money
 from .models import InventoryItem, Supplier, Inventory, InventoryHistory
-from .services import InventoryUpdateService
+from .services import InventoryUpdateService, InventoryConsumptionService
 from ..users.utils import get_user_preferrence_from_cache
 import logging
 
@@ -122,6 +124,9 @@ class InventoryHistorySerializer(serializers.ModelSerializer):
 class InventorySerializer(serializers.ModelSerializer):
     inventory_item = InventoryItemSerializer(read_only=True)
     below_reorder = serializers.BooleanField(read_only=True)
+    reserved = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
     entries = serializers.ListField(
         child=serializers.DictField(allow_empty=False),
         min_length=1,
@@ -131,7 +136,7 @@ class InventorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Inventory
-        exclude = ["created_by", "updated_at", "created_at", "is_active"]
+        exclude = ["created_by", "updated_at", "created_at", "is_active", "version"]
         read_only_fields = [
             "id",
             "inventory_item",
@@ -148,29 +153,16 @@ class InventorySerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         validated_data = super().validate(attrs)
 
-        entries = validated_data.get("entries")
-        for entry in entries:
-            inventory_item_id = entry.get("inventory_item_id")
-            quantity = entry.get("quantity")
-
-            if not all([inventory_item_id, quantity]):
-                raise serializers.ValidationError(
-                    "Each entry must contain inventory_item_id and quantity."
-                )
-
-            if not isinstance(quantity, (int, float)) or quantity <= 0:
-                raise serializers.ValidationError("Quantity must be a positive number.")
-
-            try:
-                InventoryItem.objects.filter(
-                    Q(created_by=self.context["request"].user.id) | Q(is_default=True),
-                    id=inventory_item_id,
-                )
-            except InventoryItem.DoesNotExist:
-                raise serializers.ValidationError(
-                    f"Inventory item with id {inventory_item_id} does not exist."
-                )
+        # All entries are resolved together so every problem is reported at once
+        entries, errors = InventoryUpdateService.validate_entries(
+            self.context["request"].user, enumerate(validated_data.get("entries"))
+        )
+        if errors:
+            raise serializers.ValidationError(
+                {"entries": {error["row"]: error["errors"] for error in errors}}
+            )
 
+        validated_data["entries"] = entries
         return validated_data
 
     def create(self, validated_data):
@@ -189,4 +181,31 @@ class InventorySerializer(serializers.ModelSerializer):
         representation["reorder_level"] = (
             str(instance.reorder_level) + instance.inventory_item.unit
         )
+        # Reserved by pending orders, so available is what can still be promised
+        reserved = getattr(instance, "reserved", Decimal(0))
+        representation["reserved"] = str(reserved) + instance.inventory_item.unit
+        representation["available"] = (
+            str(instance.quantity - reserved) + instance.inventory_item.unit
+        )
         return representation
+
+
+class InventoryConsumeLineSerializer(serializers.Serializer):
+    inventory_item_id = serializers.UUIDField()
+    quantity = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.01")
+    )
+    incident_date = serializers.DateField(required=False)
+
+    def validate_incident_date(self, value):
+        if value > timezone.now().date():
+            raise serializers.ValidationError("Incident date cannot be in the future.")
+        return value
+
+
+class InventoryConsumeSerializer(serializers.Serializer):
+    lines = InventoryConsumeLineSerializer(many=True, min_length=1, max_length=1000)
+
+    def create(self, validated_data):
+        user = self.context["request"].user
+        return InventoryConsumptionService.consume(user, validated_data["lines"])
@@ -1,18 +1,378 @@
-from django.db import transaction
-from django.db.models import Case, When, DecimalField, F, Subquery, OuterRef, Max
-from django.db.models.functions import Cast
-from django.db.models import CharField
-from .models import Inventory, InventoryHistory
+import csv
+import json
+import logging
+import uuid
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from contextlib import contextmanager
+from itertools import islice
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models.functions import Coalesce
+from django.db.models import (
+    Case,
+    When,
+    DecimalField,
+    F,
+    Subquery,
+    OuterRef,
+    Max,
+    Q,
+    Count,
+    Sum,
+    Value,
+)
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from .models import (
+    Inventory,
+    InventoryHistory,
+    InventoryItem,
+    InventorySummary,
+    StockReservation,
+    Supplier,
+)
+from ..dashboard.utils import invalidate_dashboard_cache
+from ..jobs.services import JobService
 from ..recipes.services import RecipeService
 
+logger = logging.getLogger(__name__)
+
+COST_CASCADE_JOB = "inventory.cascade_cost_updates"
+
+# PostgreSQL SQLSTATE for a deadlock victim
+DEADLOCK_DETECTED = "40P01"
+
+
+class InventorySummaryService:
+    """
+    Maintains each user's InventorySummary from the rows a change touches,
+    instead of re-aggregating all of their stock on every read.
+    """
+
+    @classmethod
+    @contextmanager
+    def track(cls, user, item_ids):
+        """
+        Wrap a change to the user's stock for `item_ids`.
+        The rows are locked and measured before and after the block and the
+        difference is applied to the summary in the same transaction.
+        """
+        item_ids = list(item_ids)
+        with transaction.atomic():
+            before = cls._snapshot(user, item_ids, lock=True)
+            yield
+            after = cls._snapshot(user, item_ids)
+            cls.apply_delta(user, before, after)
+
+    @classmethod
+    def apply_delta(cls, user, before, after):
+        """Move the summary from the `before` rows to the `after` rows"""
+        old, new = cls._totals(before), cls._totals(after)
+        below, above, value = (n - o for n, o in zip(new, old))
+        if not (below or above or value):
+            return
+
+        updated = InventorySummary.objects.filter(user=user).update(
+            below_reorder_count=F("below_reorder_count") + below,
+            above_reorder_count=F("above_reorder_count") + above,
+            total_value=F("total_value") + value,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            # First change for this user, the rebuild already includes it
+            cls.rebuild(user)
+
+    @classmethod
+    def get_summary(cls, user):
+        """Totals for the user's stock, built on first use"""
+        summary = InventorySummary.objects.filter(user=user).first()
+        return summary or cls.rebuild(user)
+
+    @classmethod
+    def rebuild(cls, user):
+        """
+        Recompute the user's summary from their Inventory rows.
+        `user` may be a user or a user id, as background jobs pass ids.
+        """
+        totals = cls.aggregate(Inventory.objects.filter(created_by=user, is_active=True))
+        summary, _ = InventorySummary.objects.update_or_create(
+            user_id=getattr(user, "pk", user),
+            defaults={
+                "below_reorder_count": totals["total_count_below_reorder"],
+                "above_reorder_count": totals["total_count_above_reorder"],
+                "total_value": totals["total_value"] or 0,
+            },
+        )
+        return summary
+
+    @staticmethod
+    def aggregate(queryset):
+        """Scan a stock queryset for the totals the summary holds"""
+        return queryset.aggregate(
+            total_count_below_reorder=Count(
+                "id", filter=Q(quantity__lte=F("reorder_level"))
+            ),
+            total_count_above_reorder=Count(
+                "id", filter=Q(quantity__gt=F("reorder_level"))
+            ),
+            total_value=Sum("total_value"),
+        )
+
+    @staticmethod
+    def _snapshot(user, item_ids, lock=False):
+        rows = Inventory.objects.filter(
+            created_by=user, is_active=True, inventory_item_id__in=item_ids
+        )
+        if lock:
+            # A fixed lock order keeps concurrent changes from deadlocking
+            rows = rows.select_for_update().order_by("inventory_item_id")
+        return list(rows.values_list("quantity", "reorder_level", "total_value"))
+
+    @staticmethod
+    def _totals(rows):
+        below = sum(
+            1 for quantity, reorder_level, _ in rows if quantity <= reorder_level
+        )
+        value = sum((total_value for _, _, total_value in rows), Decimal(0))
+        return below, len(rows) - below, value
+
+
+class StockAvailabilityService:
+    """Stock on hand less what pending orders have reserved"""
+
+    @staticmethod
+    def annotate(queryset):
+        """Add `reserved` to an Inventory queryset"""
+        reserved = (
+            StockReservation.objects.filter(
+                created_by=OuterRef("created_by"),
+                inventory_item=OuterRef("inventory_item"),
+            )
+            .values("inventory_item")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        )
+        return queryset.annotate(
+            reserved=Coalesce(
+                Subquery(reserved),
+                Value(Decimal(0)),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+    @staticmethod
+    def available(user, item_ids):
+        """{inventory_item_id: on hand less reserved} for the given items"""
+        available = dict(
+            Inventory.objects.filter(
+                created_by=user, is_active=True, inventory_item_id__in=item_ids
+            ).values_list("inventory_item_id", "quantity")
+        )
+        reserved = (
+            StockReservation.objects.filter(
+                created_by=user, inventory_item_id__in=item_ids
+            )
+            .values("inventory_item_id")
+            .annotate(total=Sum("quantity"))
+            .values_list("inventory_item_id", "total")
+        )
+        for item_id, total in reserved:
+            available[item_id] = available.get(item_id, Decimal(0)) - total
+        return {item_id: available.get(item_id, Decimal(0)) for item_id in item_ids}
+
+
+class InsufficientStock(APIException):
+    status_code = 400
+    default_code = "insufficient_stock"
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__(
+            {
+                "error": "Insufficient stock.",
+                "shortfalls": {
+                    str(item_id): str(shortfall)
+                    for item_id, shortfall in shortfalls.items()
+                },
+            }
+        )
+
+
+class StockConflict(APIException):
+    status_code = 409
+    default_detail = "Stock is being changed by another request, please retry."
+    default_code = "stock_conflict"
+
+
+class _VersionConflict(Exception):
+    """Another writer changed a row between our read and our write"""
+
+
+class StockLedgerService:
+    """
+    The one place stock quantities change.
+
+    Rows are read without locks and written back with a single UPDATE that
+    only matches the versions that were read. When another writer got there
+    first the change is planned again on fresh rows. Retries lock the rows
+    they read, so writes that do not collide never wait on each other and
+    writes to hot items lose at most one attempt.
+    """
+
+    @classmethod
+    def apply(cls, user, item_ids, plan):
+        """
+        Change the user's stock for `item_ids`.
+
+        `plan(stock)` receives {item_id: Inventory} for the rows that exist and
+        returns {item_id: signed quantity change}. It may run more than once,
+        so it must not have side effects beyond its return value. Missing rows
+        are created for positive changes and no row may go below zero.
+        Returns the changes that were applied.
+        """
+        item_ids = set(item_ids)
+        attempts = settings.STOCK_LEDGER_MAX_ATTEMPTS
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic():
+                    stock = cls._read(user, item_ids, lock=attempt > 1)
+                    changes = {
+                        item_id: change
+                        for item_id, change in plan(stock).items()
+                        if change
+                    }
+                    cls._write(user, stock, changes, locked=attempt > 1)
+                    invalidate_dashboard_cache(user.id)
+                    return changes
+            except OperationalError as e:
+                # Writers locking the same rows outside the ledger can still deadlock
+                if getattr(e.__cause__, "pgcode", None) != DEADLOCK_DETECTED:
+                    raise
+                logger.info(f"Stock deadlock, attempt {attempt} of {attempts}")
+            except _VersionConflict:
+                logger.info(f"Stock version conflict, attempt {attempt} of {attempts}")
+        raise StockConflict()
+
+    @staticmethod
+    def _read(user, item_ids, lock=False):
+        rows = Inventory.objects.filter(
+            created_by=user, inventory_item_id__in=item_ids
+        ).only(
+            "id",
+            "inventory_item_id",
+            "quantity",
+            "reorder_level",
+            "cost_per_unit",
+            "total_value",
+            "version",
+            "is_active",
+        )
+        if lock:
+            rows = rows.select_for_update().order_by("inventory_item_id")
+        return {row.inventory_item_id: row for row in rows}
+
+    @classmethod
+    def _write(cls, user, stock, changes, locked=False):
+        shortfalls = {}
+        for item_id, change in changes.items():
+            available = stock[item_id].quantity if item_id in stock else 0
+            if available + change < 0:
+                shortfalls[item_id] = -(available + change)
+        if shortfalls:
+            raise InsufficientStock(shortfalls)
+
+        existing = [item_id for item_id in changes if item_id in stock]
+        if existing:
+            versions = Q()
+            for item_id in existing:
+                versions |= Q(inventory_item=item_id, version=stock[item_id].version)
+            quantity = Case(
+                *[
+                    When(
+                        inventory_item=item_id, then=F("quantity") + changes[item_id]
+                    )
+                    for item_id in existing
+                ],
+                output_field=DecimalField(),
+            )
+            # Rows are locked in item order so concurrent writers cannot deadlock.
+            # A row another writer holds is skipped, which reports the conflict
+            # straight away instead of after that writer commits.
+            matching = (
+                Inventory.objects.filter(created_by=user)
+                .filter(versions)
+                .order_by("inventory_item_id")
+                .select_for_update(skip_locked=not locked)
+                .values("pk")
+            )
+            updated = Inventory.objects.filter(pk__in=Subquery(matching)).update(
+                quantity=quantity,
+                total_value=quantity * F("cost_per_unit"),
+                version=F("version") + 1,
+                updated_at=timezone.now(),
+            )
+            if updated != len(existing):
+                raise _VersionConflict()
+
+        created = [item_id for item_id in changes if item_id not in stock]
+        if created:
+            try:
+                with transaction.atomic():
+                    Inventory.objects.bulk_create(
+                        [
+                            Inventory(
+                                inventory_item_id=item_id,
+                                quantity=changes[item_id],
+                                created_by=user,
+                                version=1,
+                            )
+                            for item_id in created
+                        ]
+                    )
+            except IntegrityError:
+                # Another request created the row first
+                raise _VersionConflict()
+
+        # The versions matched, so the rows read are exactly what was replaced
+        before, after = [], []
+        for item_id, change in changes.items():
+            row = stock.get(item_id)
+            if row is None:
+                after.append((change, Decimal(0), Decimal(0)))
+                continue
+            if not row.is_active:
+                continue
+            quantity = row.quantity + change
+            before.append((row.quantity, row.reorder_level, row.total_value))
+            after.append(
+                (
+                    quantity,
+                    row.reorder_level,
+                    (quantity * row.cost_per_unit).quantize(
+                        Decimal("0.01"), rounding=ROUND_HALF_UP
+                    ),
+                )
+            )
+        InventorySummaryService.apply_delta(user, before, after)
+
 
 class InventoryUpdateService:
+    ENTRY_FIELDS = (
+        "inventory_item_id",
+        "quantity",
+        "cost_price",
+        "supplier_id",
+        "incident_date",
+    )
+
     @classmethod
     def process_inventory_updates(cls, user, entries):
         """
         1. Creates Inventory History Records
         2. Updates Inventory quantities
-        3. Manages database transactions
+        3. Queues the cost cascade for the background worker
+        4. Manages database transactions
         """
         with transaction.atomic():
 
@@ -22,42 +382,166 @@ class InventoryUpdateService:
 
             updated_items = cls._update_inventory(user, updates)
 
-            transaction.on_commit(lambda: cls._cascade_cost_updates(histories, user))
+            cls._enqueue_cost_updates(user, updates.keys())
 
-            return updated_items.select_related("inventory_item")
+            return StockAvailabilityService.annotate(
+                updated_items.select_related("inventory_item")
+            )
 
     @classmethod
-    def _cascade_cost_updates(cls, histories, user):
-        """Update all affected costs"""
-        # Calculate cost for InventoryHistory instances
-        for history in histories:
-            history.calculate_cost()
+    def validate_entries(cls, user, rows):
+        """
+        Validate numbered raw entries as (row_number, entry) pairs.
+        All item and supplier ids are resolved with one query each against
+        the user's visible sets. Returns the typed entries ready for
+        process_inventory_updates and a list of per-row errors.
+        """
+        cleaned = []
+        errors = []
+        for row_number, row in rows:
+            if not isinstance(row, dict):
+                errors.append({"row": row_number, "errors": "Malformed row."})
+                continue
+            entry, row_errors = cls._clean_entry(row)
+            if row_errors:
+                errors.append({"row": row_number, "errors": row_errors})
+            else:
+                cleaned.append((row_number, entry))
+
+        # One lookup for each related set
+        item_ids = {entry["inventory_item_id"] for _, entry in cleaned}
+        known_items = set(
+            InventoryItem.objects.filter(
+                Q(created_by=user) | Q(is_default=True), id__in=item_ids
+            ).values_list("id", flat=True)
+        )
+        supplier_ids = {
+            entry["supplier_id"] for _, entry in cleaned if entry["supplier_id"]
+        }
+        known_suppliers = (
+            set(
+                Supplier.objects.filter(
+                    created_by=user, id__in=supplier_ids
+                ).values_list("id", flat=True)
+            )
+            if supplier_ids
+            else set()
+        )
+
+        entries = []
+        for row_number, entry in cleaned:
+            row_errors = {}
+            if entry["inventory_item_id"] not in known_items:
+                row_errors["inventory_item_id"] = (
+                    f"Inventory item with id {entry['inventory_item_id']} does not exist."
+                )
+            if entry["supplier_id"] and entry["supplier_id"] not in known_suppliers:
+                row_errors["supplier_id"] = (
+                    f"Supplier with id {entry['supplier_id']} does not exist."
+                )
+            if row_errors:
+                errors.append({"row": row_number, "errors": row_errors})
+                continue
+            entries.append(entry)
+
+        errors.sort(key=lambda error: error["row"])
+        return entries, errors
+
+    @classmethod
+    def _clean_entry(cls, row):
+        """Parse a raw entry, returning field errors instead of raising"""
+        values = {
+            field: str(row[field]).strip() if row.get(field) is not None else ""
+            for field in cls.ENTRY_FIELDS
+        }
+        entry = {}
+        errors = {}
+
+        try:
+            entry["inventory_item_id"] = uuid.UUID(values["inventory_item_id"])
+        except ValueError:
+            errors["inventory_item_id"] = "A valid UUID is required."
+
+        for field, required in (("quantity", True), ("cost_price", False)):
+            try:
+                amount = Decimal(values[field] or ("" if required else "0"))
+                if not amount.is_finite() or amount.as_tuple().exponent < -2:  # type: ignore
+                    raise InvalidOperation
+            except InvalidOperation:
+                errors[field] = "A number with at most 2 decimal places is required."
+                continue
+            if field == "quantity" and amount <= 0:
+                errors[field] = "Quantity must be a positive number."
+            elif amount < 0:
+                errors[field] = "Cost price cannot be negative."
+            elif amount >= 10**8:
+                errors[field] = "Value is too large."
+            entry[field] = amount
+
+        try:
+            entry["supplier_id"] = (
+                uuid.UUID(values["supplier_id"]) if values["supplier_id"] else None
+            )
+        except ValueError:
+            errors["supplier_id"] = "A valid UUID is required."
 
-        # Get unique inventory_items that were updated
-        item_ids = {h.inventory_item_id for h in histories}
+        today = timezone.now().date()
+        try:
+            entry["incident_date"] = (
+                date.fromisoformat(values["incident_date"])
+                if values["incident_date"]
+                else today
+            )
+        except ValueError:
+            errors["incident_date"] = "Date must be in YYYY-MM-DD format."
+        else:
+            if entry["incident_date"] > today:
+                errors["incident_date"] = "Incident date cannot be in the future."
+
+        return entry, errors
+
+    @staticmethod
+    def _enqueue_cost_updates(user, item_ids):
+        """Queue one cascade per (user, inventory_item), coalescing with pending ones"""
+        JobService.enqueue(
+            COST_CASCADE_JOB,
+            [
+                (
+                    f"{user.id}:{item_id}",
+                    {"user_id": str(user.id), "inventory_item_id": str(item_id)},
+                )
+                for item_id in item_ids
+            ],
+        )
 
+    @classmethod
+    def _cascade_cost_updates(cls, item_ids, user):
+        """Update all affected costs"""
         # Updating inventory costs
-        cls._bulk_update_inventory_costs(item_ids, user)
+        with InventorySummaryService.track(user, item_ids):
+            cls._bulk_update_inventory_costs(item_ids, user)
 
         # Updating cost for affected Recipes
         RecipeService._bulk_update_recipe_inventory_costs(item_ids, user)
 
     @staticmethod
     def _prepare_data(user, entries):
-        """Structure entries data"""
+        """Structure entries data, pricing each history row before it is inserted"""
         histories = []
         updates = {}
 
         for entry in entries:
             item_id = entry["inventory_item_id"]
             quantity = entry["quantity"]
+            cost_price = entry.get("cost_price") or 0
 
             histories.append(
                 InventoryHistory(
                     inventory_item_id=item_id,
                     quantity=quantity,
                     supplier_id=entry.get("supplier_id"),
-                    cost_price=entry.get("cost_price"),
+                    cost_price=cost_price,
+                    cost_per_unit=InventoryHistory.unit_cost(cost_price, quantity),
                     incident_date=entry.get("incident_date"),
                     created_by=user,
                 )
@@ -74,42 +558,8 @@ class InventoryUpdateService:
 
     @staticmethod
     def _update_inventory(user, updates):
-        """Handle all inventory updates"""
-        existing = Inventory.objects.filter(
-            created_by=user, inventory_item_id__in=updates.keys()
-        ).select_for_update()
-
-        # Casting UUIDs to str for comparison
-        existing_ids = set(
-            existing.annotate(
-                item_id_str=Cast("inventory_item_id", CharField())
-            ).values_list("item_id_str", flat=True)
-        )
-
-        # Creating new items
-        new_ids = set(updates.keys()) - existing_ids
-        if new_ids:
-            Inventory.objects.bulk_create(
-                [
-                    Inventory(
-                        inventory_item_id=item_id,
-                        quantity=updates[item_id],
-                        created_by=user,
-                    )
-                    for item_id in new_ids
-                ]
-            )
-
-        # Updating existing items using Case statements
-        if existing.exists():
-            cases = [
-                When(inventory_item=item_id, then=F("quantity") + quantity)
-                for item_id, quantity in updates.items()
-                if item_id in existing_ids
-            ]
-            Inventory.objects.filter(
-                created_by=user, inventory_item_id__in=existing_ids
-            ).update(quantity=Case(*cases, output_field=DecimalField()))
+        """Add the received quantities through the stock ledger"""
+        StockLedgerService.apply(user, updates.keys(), lambda stock: updates)
         return Inventory.objects.filter(
             created_by=user, inventory_item_id__in=updates.keys()
         )
@@ -136,5 +586,144 @@ class InventoryUpdateService:
             .update(
                 cost_per_unit=F("recent_max_cost"),
                 total_value=F("quantity") * F("recent_max_cost"),
+                version=F("version") + 1,
             )
         )
+
+
+class InventoryConsumptionService:
+    """Stock used or wasted, recorded as many lines in one transaction"""
+
+    CONSUMED = "consumed"
+    INSUFFICIENT_STOCK = "insufficient_stock"
+    NOT_FOUND = "not_found"
+
+    @classmethod
+    def consume(cls, user, lines):
+        """
+        Apply (inventory_item_id, quantity, incident_date) lines in order.
+        Lines are allocated against the stock one after another, so a line
+        fails alone when what is left cannot cover it. Returns one result
+        per line with its status and the quantity left after it.
+        """
+        results = []
+
+        def plan(stock):
+            results[:] = cls._allocate(
+                lines,
+                {
+                    item_id: row.quantity
+                    for item_id, row in stock.items()
+                    if row.is_active
+                },
+            )
+            consumed = {}
+            for line, result in zip(lines, results):
+                if result["status"] == cls.CONSUMED:
+                    item_id = line["inventory_item_id"]
+                    consumed[item_id] = consumed.get(item_id, 0) - line["quantity"]
+            return consumed
+
+        with transaction.atomic():
+            StockLedgerService.apply(
+                user, {line["inventory_item_id"] for line in lines}, plan
+            )
+            InventoryHistory.objects.bulk_create(
+                [
+                    InventoryHistory(
+                        inventory_item_id=line["inventory_item_id"],
+                        quantity=line["quantity"],
+                        is_addition=False,
+                        incident_date=line.get("incident_date")
+                        or timezone.now().date(),
+                        created_by=user,
+                    )
+                    for line, result in zip(lines, results)
+                    if result["status"] == cls.CONSUMED
+                ]
+            )
+        return results
+
+    @classmethod
+    def _allocate(cls, lines, remaining):
+        results = []
+        for index, line in enumerate(lines):
+            item_id = line["inventory_item_id"]
+            quantity = line["quantity"]
+            available = remaining.get(item_id)
+
+            if available is None:
+                status = cls.NOT_FOUND
+            elif available < quantity:
+                status = cls.INSUFFICIENT_STOCK
+            else:
+                status = cls.CONSUMED
+                available = remaining[item_id] = available - quantity
+
+            results.append(
+                {
+                    "line": index,
+                    "inventory_item_id": item_id,
+                    "quantity": quantity,
+                    "status": status,
+                    "remaining": available,
+                }
+            )
+        return results
+
+
+class InventoryImportService:
+    """
+    Stock receipts imported from CSV or NDJSON streams of any size.
+    Rows are validated and applied in chunks so memory stays bounded.
+    """
+
+    CHUNK_SIZE = 500
+    MAX_REPORTED_ERRORS = 1000
+
+    @staticmethod
+    def read_csv(lines):
+        """Yield (row_number, row) from CSV lines with a header row"""
+        reader = csv.DictReader(line.decode("utf-8-sig") for line in lines)
+        for row_number, row in enumerate(reader, start=1):
+            yield row_number, row
+
+    @staticmethod
+    def read_ndjson(lines):
+        """Yield (row_number, row) from newline-delimited JSON, skipping blank lines"""
+        row_number = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row_number, row if isinstance(row, dict) else None
+
+    @classmethod
+    def import_rows(cls, user, rows):
+        """
+        Validate rows chunk by chunk against the user's items and suppliers,
+        feed valid ones to InventoryUpdateService and report rejected ones.
+        Each chunk commits on its own.
+        """
+        report = {"rows": 0, "imported": 0, "failed": 0, "errors": []}
+        rows = iter(rows)
+
+        while chunk := list(islice(rows, cls.CHUNK_SIZE)):
+            entries, errors = InventoryUpdateService.validate_entries(user, chunk)
+
+            if entries:
+                InventoryUpdateService.process_inventory_updates(user, entries)
+
+            report["rows"] += len(chunk)
+            report["imported"] += len(entries)
+            report["failed"] += len(errors)
+            room = cls.MAX_REPORTED_ERRORS - len(report["errors"])
+            report["errors"].extend(errors[:room])
+
+        report["errors_truncated"] = report["failed"] > len(report["errors"])
+        return report
@@ -0,0 +1,14 @@
+from collections import defaultdict
+from ..jobs.services import register
+from .services import InventoryUpdateService, COST_CASCADE_JOB
+
+
+@register(COST_CASCADE_JOB)
+def cascade_cost_updates(payloads):
+    """Run one cost cascade per user for every item queued in the batch"""
+    item_ids_by_user = defaultdict(set)
+    for payload in payloads:
+        item_ids_by_user[payload["user_id"]].add(payload["inventory_item_id"])
+
+    for user_id, item_ids in item_ids_by_user.items():
+        InventoryUpdateService._cascade_cost_updates(item_ids, user_id)
@@ -1,16 +1,6 @@
-from datetime import datetime
-from django.db.models import (
-    Q,
-    F,
-    BooleanField,
-    Case,
-    When,
-    Value,
-    Sum,
-    Count,
-    IntegerField,
-)
+from django.db.models import Q, F, BooleanField, Case, When, Value
 from django.db import transaction
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
@@ -25,8 +15,19 @@ from .serializers import (
     SupplierSerializer,
     InventorySerializer,
     InventoryHistorySerializer,
+    InventoryConsumeSerializer,
+    InventoryConsumeLineSerializer,
 )
 from .filters import InventoryFilter
+from .pagination import InventoryHistoryPagination
+from .services import (
+    InventoryConsumptionService,
+    InventoryImportService,
+    InventorySummaryService,
+    StockAvailabilityService,
+)
+from ..common.imports import import_errors, import_source
+from ..dashboard.utils import invalidate_dashboard_cache
 from ..recipes.serializers import RecipeSerializer
 from ..users.utils import get_user_preferrence_from_cache
 
@@ -97,11 +98,13 @@ class InventoryView(ModelViewSet):
             else Inventory.objects.filter(created_by=user, is_active=True)
         )
 
-        return base_queryset.annotate(
-            below_reorder=Case(
-                When(quantity__lt=F("reorder_level"), then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField(),
+        return StockAvailabilityService.annotate(
+            base_queryset.annotate(
+                below_reorder=Case(
+                    When(quantity__lt=F("reorder_level"), then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                )
             )
         ).select_related("inventory_item")
 
@@ -117,77 +120,32 @@ class InventoryView(ModelViewSet):
         )
 
     def list(self, request, *args, **kwargs):
-        base_queryset = self.get_queryset()
-
-        if base_queryset:
-            # Add aggregated data to the response
-            aggregated_data = base_queryset.aggregate(
-                total_count_below_reorder=Count(
-                    Case(
-                        When(quantity__lte=F("reorder_level"), then=1),
-                        output_field=IntegerField(),
-                    )
-                ),
-                total_count_above_reorder=Count(
-                    Case(
-                        When(quantity__gt=F("reorder_level"), then=1),
-                        output_field=IntegerField(),
-                    )
-                ),
-                total_value=Sum("total_value"),
+        user = request.user
+        aggregated_data = (
+            InventorySummaryService.aggregate(self.get_queryset())
+            if user.is_superuser
+            else InventorySummaryService.get_summary(user).as_totals()
+        )
+        aggregated_data["total_value"] = str(
+            Money(
+                aggregated_data["total_value"] or 0,
+                get_user_preferrence_from_cache(user.id, "currency", "USD"),
             )
+        )
 
-            queryset = self.filter_queryset(self.get_queryset())
-
-            page = self.paginate_queryset(queryset)
-            if page is not None:
-                serializer = self.get_serializer(page, many=True)
-
-                response = self.get_paginated_response(serializer.data)
-                response.data.update(aggregated_data)
-                response.data["total_value"] = str(
-                    Money(
-                        aggregated_data["total_value"],
-                        get_user_preferrence_from_cache(
-                            self.request.user, "currency", "USD"
-                        ),
-                    )
-                )
-                return response
-
-            serializer = self.get_serializer(queryset, many=True)
-            response_data = {
-                "results": serializer.data,
-                **aggregated_data,
-                "total_value": str(
-                    Money(
-                        aggregated_data["total_value"] or 0,
-                        get_user_preferrence_from_cache(
-                            self.request.user, "currency", "USD"
-                        ),
-                    )
-                ),
-            }
-            return Response(response_data, status=status.HTTP_200_OK)
-
-        #     if response.data:
-        #         # If response.data is a list, wrap it in a dict
-        #         response.data["total_count_below_reorder"] = result[
-        #             "total_count_below_reorder"
-        #         ]
-        #         response.data["total_count_above_reorder"] = result[
-        #             "total_count_above_reorder"
-        #         ]
-        #         response.data["total_value"] = str(
-        #             Money(
-        #                 aggregated_data["total_value"],
-        #                 get_user_preferrence_from_cache(
-        #                     self.request.user, "currency", "USD"
-        #                 ),
-        #             )
-        #         )
-
-        # return response
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+
+            response = self.get_paginated_response(serializer.data)
+            response.data.update(aggregated_data)
+            return response
+
+        serializer = self.get_serializer(queryset, many=True)
+        response_data = {"results": serializer.data, **aggregated_data}
+        return Response(response_data, status=status.HTTP_200_OK)
 
     def partial_update(self, request, *args, **kwargs):
         allowed_fields = {"reorder_level"}
@@ -200,8 +158,16 @@ class InventoryView(ModelViewSet):
         instance = self.get_object()
         new_reorder_level = self.request.data.get("reorder_level")
         if new_reorder_level:
-            instance.reorder_level = new_reorder_level
-            instance.save()
+            # Only the reorder level is written, so concurrent stock changes survive
+            with InventorySummaryService.track(
+                instance.created_by, [instance.inventory_item_id]
+            ):
+                Inventory.objects.filter(pk=instance.pk).update(
+                    reorder_level=new_reorder_level,
+                    version=F("version") + 1,
+                    updated_at=timezone.now(),
+                )
+            invalidate_dashboard_cache(instance.created_by_id)
 
             return Response(
                 {"message": "Reorder level updated."}, status=status.HTTP_200_OK
@@ -226,7 +192,11 @@ class InventoryView(ModelViewSet):
             serializer.is_valid(raise_exception=True)
             serializer.save()
 
-            instance.delete()
+            with InventorySummaryService.track(
+                instance.created_by, [instance.inventory_item_id]
+            ):
+                instance.delete()
+            invalidate_dashboard_cache(instance.created_by_id)
 
         return Response(
             {"message": "Inventory entry deleted successfully."},
@@ -236,70 +206,106 @@ class InventoryView(ModelViewSet):
     @action(methods=["put"], detail=True, url_path="decrease")
     def decrease_stock(self, request, *args, pk=None, **kwargs):
         inventory = self.get_object()
-        quantity = int(request.data.get("quantity", 0))
-        incident_date = request.data.get("incident_date", datetime.today())
-
-        if quantity <= 0:
-            return Response(
-                {"error": "Quantity must be greater than zero."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if incident_date > datetime.today():
-            return Response(
-                {"error": "Incident date cannot be in the future."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        line = {
+            "inventory_item_id": inventory.inventory_item_id,
+            "quantity": request.data.get("quantity", 0),
+        }
+        if request.data.get("incident_date"):
+            line["incident_date"] = request.data["incident_date"]
+
+        serializer = InventoryConsumeLineSerializer(data=line)
+        serializer.is_valid(raise_exception=True)
 
-        if inventory.quantity < quantity:
+        [result] = InventoryConsumptionService.consume(
+            inventory.created_by, [serializer.validated_data]
+        )
+        if result["status"] != InventoryConsumptionService.CONSUMED:
             return Response(
                 {"error": "Insufficient stock."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            # Decrease the stock
-            updated = Inventory.objects.filter(pk=pk, quantity__gte=quantity).update(
-                quantity=F("quantity") - quantity
-            )
-            if not updated:
-                return Response(
-                    {"error": "Failed to decrease stock."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        return Response(
+            {"message": "Stock decreased successfully."}, status=status.HTTP_200_OK
+        )
 
-            inventory.refresh_from_db()
+    @action(methods=["post"], detail=False, url_path="consume")
+    def consume_stock(self, request, *args, **kwargs):
+        """
+        Record usage or wastage for many items at once. Each line reports
+        "consumed", "insufficient_stock" or "not_found"; failed lines leave
+        stock untouched while the rest are applied.
+        """
+        serializer = InventoryConsumeSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response(
+            {
+                "consumed": sum(
+                    result["status"] == InventoryConsumptionService.CONSUMED
+                    for result in results
+                ),
+                "failed": sum(
+                    result["status"] != InventoryConsumptionService.CONSUMED
+                    for result in results
+                ),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
 
-            # Log the inventory history
-            inventory_history_data = {
-                "inventory_item_id": inventory.inventory_item.id,
-                "quantity": quantity,
-                "is_addition": False,
-                "incident_date": incident_date,
-            }
-            serializer = InventoryHistorySerializer(
-                data=inventory_history_data, context={"request": request}
+    @action(methods=["post"], detail=False, url_path="import")
+    def import_stock(self, request, *args, **kwargs):
+        """
+        Import stock receipts from a CSV (text/csv) or NDJSON
+        (application/x-ndjson) request body, or from a multipart upload named
+        "file". Rows are streamed, so the 20-entry limit does not apply.
+        CSV headers: inventory_item_id, quantity, cost_price, supplier_id,
+        incident_date.
+        """
+        source = import_source(
+            request,
+            {
+                "text/csv": "csv",
+                "application/x-ndjson": "ndjson",
+                "application/ndjson": "ndjson",
+            },
+            upload_formats={".csv": "csv"},
+            upload_default="ndjson",
+        )
+        if source is None:
+            return Response(
+                {"error": "Send text/csv, application/x-ndjson or a file upload."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
 
-        return Response(
-            {"message": "Stock decreased successfully."}, status=status.HTTP_200_OK
+        data_format, lines = source
+        rows = (
+            InventoryImportService.read_csv(lines)
+            if data_format == "csv"
+            else InventoryImportService.read_ndjson(lines)
         )
+        # Chunks already read stay imported if a later line cannot be read
+        with import_errors():
+            report = InventoryImportService.import_rows(request.user, rows)
+        if not report["rows"]:
+            raise ValidationError({"error": "No rows were provided."})
+        return Response(report, status=status.HTTP_200_OK)
 
     @action(methods=["get"], detail=True, url_path="history")
     def view_inventory_item_history(self, request, *args, **kwargs):
         inventory = self.get_object()
-        history = (
-            InventoryHistory.objects.filter(
-                inventory_item=inventory.inventory_item, created_by=request.user
-            )
-            .order_by("-created_at")
-            .select_related("supplier")
-        )
+        history = InventoryHistory.objects.filter(
+            inventory_item=inventory.inventory_item, created_by=request.user
+        ).select_related("inventory_item", "supplier")
+
+        paginator = InventoryHistoryPagination()
+        page = paginator.paginate_queryset(history, request, view=self)
         serializer = InventoryHistorySerializer(
-            history, many=True, context={"request": request}
+            page, many=True, context={"request": request}
         )
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(methods=["get"], detail=True, url_path="recipes")
     def view_inventory_item_recipes(self, request, *args, **kwargs):
@@ -315,6 +321,7 @@ class InventoryHistoryView(ListAPIView):
     queryset = InventoryHistory.objects.none()
     serializer_class = InventoryHistorySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = InventoryHistoryPagination
     filter_fields = [
         "created_at",
         "incident_date",
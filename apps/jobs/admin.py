@@ -0,0 +1,29 @@
+from django.contrib import admin
+from .models import Job, ScheduledRun
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "key", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "key")
+    readonly_fields = ("created_at", "updated_at")
+    fieldsets = (
+        ("Job", {"fields": ("name", "key", "payload")}),
+        ("Execution", {"fields": ("status", "run_after", "attempts", "last_error")}),
+        (
+            "System Information",
+            {
+                "fields": ("created_at", "updated_at"),
+                "classes": ("collapse",),
+            },
+        ),
+    )
+
+
+@admin.register(ScheduledRun)
+class ScheduledRunAdmin(admin.ModelAdmin):
+    list_display = ("name", "run_on", "status", "attempts", "started_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name",)
+    readonly_fields = ("created_at", "updated_at")
@@ -0,0 +1,39 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ...services import JobService
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue once and exit"
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.JOBS_BATCH_SIZE)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        requeued = JobService.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        self.stdout.write("Worker started.")
+        try:
+            while True:
+                close_old_connections()
+                if JobService.run_pending(options["batch_size"]):
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Worker stopped."))
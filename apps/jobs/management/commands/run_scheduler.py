@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ...services import SchedulerService
+
+
+class Command(BaseCommand):
+    help = "Run daily tasks that are due, once per day across all schedulers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Run what is due and exit (for cron)"
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.SCHEDULER_POLL_INTERVAL,
+            help="Seconds between checks for due tasks",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Scheduler started.")
+        try:
+            while True:
+                close_old_connections()
+                for name in SchedulerService.run_due():
+                    self.stdout.write(f"Ran {name}.")
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped."))
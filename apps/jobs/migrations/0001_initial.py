@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-16 20:49
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('is_active', models.BooleanField(default=True)),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(blank=True, help_text='Pending jobs sharing a name and key are coalesced into one', max_length=255, null=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['run_after'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['run_after'], name='jobs_job_pending_idx'), models.Index(fields=['status', 'updated_at'], name='jobs_job_status_9ab298_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('name', 'key'), name='jobs_job_unique_pending_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from ..common.models import BaseModel
+
+
+class Job(BaseModel):
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=100)
+    key = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="Pending jobs sharing a name and key are coalesced into one",
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+
+    class Meta:  # type: ignore
+        ordering = ["run_after"]
+        indexes = [
+            models.Index(
+                fields=["run_after"],
+                condition=Q(status="pending"),
+                name="jobs_job_pending_idx",
+            ),
+            models.Index(fields=["status", "updated_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "key"],
+                condition=Q(status="pending"),
+                name="jobs_job_unique_pending_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.key})" if self.key else self.name
+
+
+class ScheduledRun(BaseModel):
+    """One day's run of a daily task, so each task runs once a day across workers"""
+
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=100)
+    run_on = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=RUNNING)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=1)
+    result = models.JSONField(default=dict, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    class Meta:  # type: ignore
+        ordering = ["-run_on", "name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "run_on"], name="jobs_scheduledrun_unique_day"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.run_on})"
@@ -0,0 +1,254 @@
+import json
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Job, ScheduledRun
+import logging
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_daily_tasks = {}
+
+
+def register(name):
+    """
+    Register a handler for jobs called `name`.
+
+    Handlers receive the list of payloads claimed in one batch, so work that
+    was enqueued separately can be merged into a single pass.
+    """
+
+    def decorator(func):
+        _handlers[name] = func
+        return func
+
+    return decorator
+
+
+def daily(name):
+    """
+    Register `func` to run once a day, claimed by whichever scheduler
+    reaches it first. It may return a JSON-serialisable dict that is stored
+    on the day's ScheduledRun. It runs outside any transaction and manages
+    its own.
+    """
+
+    def decorator(func):
+        _daily_tasks[name] = func
+        return func
+
+    return decorator
+
+
+class JobService:
+    @staticmethod
+    def enqueue(name, jobs, run_after=None):
+        """
+        Queue jobs as (key, payload) pairs.
+        Jobs whose key is already pending are dropped, the pending one covers them.
+        Call inside the transaction making the change so both commit together.
+        """
+        run_after = run_after or timezone.now()
+        return Job.objects.bulk_create(
+            [
+                Job(name=name, key=key, payload=payload, run_after=run_after)
+                for key, payload in jobs
+            ],
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def enqueue_merged(name, key, payload, merge_field, run_after=None):
+        """
+        Queue one job for `key`, or fold `payload` into the one already
+        pending: its `merge_field` list gains the new values, the other
+        fields take the new payload's values and it keeps its run_after.
+        Done as a single upsert, so concurrent callers cannot split the
+        work into several jobs.
+        """
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Job._meta.db_table} AS job
+                    (id, name, key, payload, status, run_after, attempts,
+                     created_at, updated_at, is_active)
+                VALUES (%s, %s, %s, %s::jsonb, %s, %s, 0, %s, %s, true)
+                ON CONFLICT (name, key) WHERE status = %s
+                DO UPDATE SET
+                    payload = EXCLUDED.payload || jsonb_build_object(
+                        %s,
+                        (
+                            SELECT jsonb_agg(DISTINCT value)
+                            FROM jsonb_array_elements(
+                                COALESCE(job.payload -> %s, '[]'::jsonb)
+                                || (EXCLUDED.payload -> %s)
+                            )
+                        )
+                    ),
+                    updated_at = EXCLUDED.updated_at
+                """,
+                [
+                    str(uuid.uuid4()),
+                    name,
+                    key,
+                    json.dumps(payload),
+                    Job.PENDING,
+                    run_after or now,
+                    now,
+                    now,
+                    Job.PENDING,
+                    merge_field,
+                    merge_field,
+                    merge_field,
+                ],
+            )
+
+    @classmethod
+    def run_pending(cls, batch_size=None):
+        """Claim a batch of due jobs and dispatch them. Returns the number claimed."""
+        jobs = cls._claim(batch_size or settings.JOBS_BATCH_SIZE)
+
+        grouped = defaultdict(list)
+        for job in jobs:
+            grouped[job.name].append(job)
+
+        for name, group in grouped.items():
+            handler = _handlers.get(name)
+            if handler is None:
+                cls._retry_or_fail(group, f"No handler registered for {name}")
+                continue
+            try:
+                with transaction.atomic():
+                    handler([job.payload for job in group])
+            except Exception as e:
+                logger.exception(f"Job {name} failed")
+                cls._retry_or_fail(group, str(e))
+            else:
+                # Finished jobs are removed so the table only holds outstanding work
+                Job.objects.filter(id__in=[job.id for job in group]).delete()
+
+        return len(jobs)
+
+    @classmethod
+    def requeue_stale(cls):
+        """Return jobs left running by a worker that died back to the queue"""
+        cutoff = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+        stale = list(Job.objects.filter(status=Job.RUNNING, updated_at__lt=cutoff))
+        cls._retry_or_fail(stale, "Worker stopped before the job finished")
+        return len(stale)
+
+    @staticmethod
+    def _claim(batch_size):
+        with transaction.atomic():
+            jobs = list(
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.PENDING, run_after__lte=timezone.now())
+                .order_by("run_after")[:batch_size]
+            )
+            if jobs:
+                Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                    status=Job.RUNNING,
+                    attempts=F("attempts") + 1,
+                    updated_at=timezone.now(),
+                )
+                for job in jobs:
+                    job.status = Job.RUNNING
+                    job.attempts += 1
+            return jobs
+
+    @staticmethod
+    def _retry_or_fail(jobs, error):
+        now = timezone.now()
+        for job in jobs:
+            if job.attempts < settings.JOBS_MAX_ATTEMPTS:
+                delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+                try:
+                    with transaction.atomic():
+                        Job.objects.filter(id=job.id).update(
+                            status=Job.PENDING,
+                            run_after=now + timedelta(seconds=delay),
+                            last_error=error,
+                            updated_at=now,
+                        )
+                    continue
+                except IntegrityError:
+                    # A newer job with the same key is already pending and covers this one
+                    pass
+            Job.objects.filter(id=job.id).update(
+                status=Job.FAILED, last_error=error, updated_at=now
+            )
+
+
+class SchedulerService:
+    @classmethod
+    def run_due(cls, today=None):
+        """Run every daily task that has not yet run today. Returns the names run."""
+        today = today or timezone.localdate()
+        ran = []
+        for name, func in _daily_tasks.items():
+            if not cls._claim(name, today):
+                continue
+            # Not wrapped in a transaction: tasks commit their own work, so a
+            # long task can work in chunks instead of holding every lock to the end
+            try:
+                result = func() or {}
+            except Exception as e:
+                logger.exception(f"Daily task {name} failed")
+                cls._finish(
+                    name, today, status=ScheduledRun.FAILED, last_error=str(e)
+                )
+            else:
+                cls._finish(
+                    name,
+                    today,
+                    status=ScheduledRun.SUCCEEDED,
+                    result=result,
+                    last_error=None,
+                )
+            ran.append(name)
+        return ran
+
+    @staticmethod
+    def _finish(name, today, **fields):
+        now = timezone.now()
+        with transaction.atomic():
+            ScheduledRun.objects.filter(name=name, run_on=today).update(
+                finished_at=now, updated_at=now, **fields
+            )
+
+    @staticmethod
+    def _claim(name, today):
+        """
+        Record today's run of the task, or take over a failed or stale one.
+        False when another scheduler already has it.
+        """
+        try:
+            with transaction.atomic():
+                ScheduledRun.objects.create(name=name, run_on=today)
+            return True
+        except IntegrityError:
+            pass
+
+        now = timezone.now()
+        retry_after = now - timedelta(seconds=settings.JOBS_RETRY_DELAY)
+        stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER)
+        return bool(
+            ScheduledRun.objects.filter(name=name, run_on=today)
+            .filter(
+                Q(status=ScheduledRun.FAILED, updated_at__lt=retry_after)
+                | Q(status=ScheduledRun.RUNNING, started_at__lt=stale)
+            )
+            .update(
+                status=ScheduledRun.RUNNING,
+                attempts=F("attempts") + 1,
+                started_at=now,
+                finished_at=None,
+                updated_at=now,
+            )
+        )
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django_redis import get_redis_connection
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def get_channel(user_id):
+    return f"notifications_{user_id}"
+
+
+class RedisBroker:
+    """
+    Fans events out through Redis pub/sub, so a stream served by any worker
+    process hears about notifications created by any other process.
+    """
+
+    def publish(self, user_id, event, data):
+        message = json.dumps({"event": event, "data": data}, cls=DjangoJSONEncoder)
+        try:
+            get_redis_connection("default").publish(get_channel(user_id), message)
+        except RedisError:
+            # Pushing is best effort; clients still see the header and the list
+            logger.exception("Could not publish %s for user %s", event, user_id)
+
+    async def subscribe(self, user_id):
+        subscription = RedisSubscription(user_id)
+        await subscription.open()
+        return subscription
+
+
+class RedisSubscription:
+    def __init__(self, user_id):
+        self.channel = get_channel(user_id)
+        self.client = aioredis.from_url(settings.CACHES["default"]["LOCATION"])
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+
+    async def open(self):
+        await self.pubsub.subscribe(self.channel)
+
+    async def get(self, timeout):
+        """The next event as (event, data), or None if nothing came within `timeout`"""
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        payload = json.loads(message["data"])
+        return payload["event"], payload["data"]
+
+    async def close(self):
+        try:
+            await self.pubsub.unsubscribe(self.channel)
+            await self.pubsub.aclose()
+        finally:
+            await self.client.aclose()
+
+
+class LocalBroker:
+    """
+    In-memory fan-out within one process, for tests and single-process
+    development servers. Publishing may happen on any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def publish(self, user_id, event, data):
+        # Round-trip through JSON so subscribers see what Redis would deliver
+        data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(str(user_id), ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(
+                subscription.queue.put_nowait, (event, data)
+            )
+
+    async def subscribe(self, user_id):
+        subscription = LocalSubscription(self, str(user_id))
+        with self.lock:
+            self.subscriptions.setdefault(subscription.user_id, set()).add(
+                subscription
+            )
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+
+
+class LocalSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+BROKERS = {"redis": RedisBroker, "local": LocalBroker}
+
+_broker = None
+
+
+def get_broker():
+    """The process-wide broker named by the NOTIFICATION_BROKER setting"""
+    global _broker
+    if _broker is None:
+        _broker = BROKERS[settings.NOTIFICATION_BROKER]()
+    return _broker
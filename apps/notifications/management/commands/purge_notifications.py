@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from ...utils import purge_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete notifications older than NOTIFICATION_RETENTION_DAYS. "
+        "Also run daily by run_scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Rows deleted per statement (default NOTIFICATION_PURGE_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_notifications(chunk_size=options["chunk_size"])
+        for notification_type, count in deleted.items():
+            self.stdout.write(f"{notification_type}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {sum(deleted.values())} notification(s).")
+        )
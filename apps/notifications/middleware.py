@@ -1,5 +1,5 @@
 from django.utils.deprecation import MiddlewareMixin
-from .utils import update_notification_cache
+from .utils import get_unread_notification_count
 
 
 class NotificationHeaderMiddleware(MiddlewareMixin):
@@ -8,6 +8,6 @@ class NotificationHeaderMiddleware(MiddlewareMixin):
             request.path.startswith('/api/') and 
             response.status_code == 200):
 
-            count = update_notification_cache(request.user.id)
+            count = get_unread_notification_count(request.user.id)
             response['X-Unread-Notifications'] = str(count)
         return response
\ No newline at end of file
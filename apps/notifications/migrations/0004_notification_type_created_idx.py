@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_count'),
+    ]
+
+    operations = [
+        # Covered by the (user, is_read, created_at) index, which shares its prefix
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_user_id_427e4b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['notification_type', 'created_at'], name='notification_type_created_idx'),
+        ),
+    ]
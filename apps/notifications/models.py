@@ -23,11 +23,28 @@ class Notification(BaseModel):
     object_id = models.UUIDField()
     content_object = GenericForeignKey("content_type", "object_id")
     target_url = models.URLField(max_length=500, blank=True, null=True)
+    count = models.PositiveIntegerField(
+        default=1, help_text="Occurrences coalesced into this notification"
+    )
 
     class Meta: # type: ignore
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["content_type", "object_id"]),
             models.Index(fields=["user", "is_read", "created_at"]),
-            models.Index(fields=["user", "is_read"]),
+            # Retention purges walk each type by age
+            models.Index(
+                fields=["notification_type", "created_at"],
+                name="notification_type_created_idx",
+            ),
         ]
+
+    @property
+    def coalesce_key(self):
+        """Notifications sharing this key may be folded into one"""
+        return (
+            self.user_id,
+            self.notification_type,
+            self.content_type_id,
+            str(self.object_id),
+        )
@@ -1,3 +1,4 @@
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 from .models import Notification
 
@@ -15,10 +16,31 @@ class NotificationSerializer(ModelSerializer):
             "object_id",
             "content_object",
             "target_url",
+            "count",
             "created_at",
             "updated_at",
             "is_active"
         ]
         extra_kwargs = {
             "is_read": {"required": False},
-        }
\ No newline at end of file
+        }
+
+
+class NotificationReadStateSerializer(serializers.Serializer):
+    """Which notifications to mark read: a list of ids, a created_at watermark, or all"""
+
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), min_length=1, max_length=1000, required=False
+    )
+    until = serializers.DateTimeField(required=False)
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        chosen = [
+            name for name in ("ids", "until") if attrs.get(name) is not None
+        ] + (["all"] if attrs.get("all") else [])
+        if len(chosen) != 1:
+            raise serializers.ValidationError(
+                "Provide exactly one of ids, until or all."
+            )
+        return attrs
@@ -0,0 +1,15 @@
+from ..jobs.services import daily
+from .utils import check_upcoming_deliveries, purge_notifications
+
+DELIVERY_REMINDERS_TASK = "notifications.delivery_reminders"
+PURGE_TASK = "notifications.purge"
+
+
+@daily(DELIVERY_REMINDERS_TASK)
+def send_delivery_reminders():
+    return {"reminders": check_upcoming_deliveries()}
+
+
+@daily(PURGE_TASK)
+def purge_expired_notifications():
+    return {"deleted": purge_notifications()}
@@ -1,3 +1,109 @@
-from django.test import TestCase
+import asyncio
+import json
+import uuid
+from asgiref.sync import sync_to_async
+from django.contrib.contenttypes.models import ContentType
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import broker
+from .models import Notification
+from .utils import create_notifications
+from ..orders.models import Order
+from ..users.models import User
 
-# Create your tests here.
+
+async def next_event(stream, timeout=5):
+    """The next (event, data) from an SSE stream, skipping keepalive comments"""
+    while True:
+        chunk = await asyncio.wait_for(anext(stream), timeout)
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode()
+        if chunk.startswith(":"):
+            continue
+        event, data = chunk.strip().split("\n")
+        return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+@override_settings(
+    NOTIFICATION_BROKER="local",
+    NOTIFICATION_STREAM_KEEPALIVE=1,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class NotificationStreamTests(TransactionTestCase):
+    def setUp(self):
+        broker._broker = None
+        self.user = User.objects.create_user(
+            email="stream@example.com",
+            password="Str0ng-pass-word",
+            first_name="Stream",
+            last_name="Tester",
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def tearDown(self):
+        broker._broker = None
+
+    def notify(self):
+        return create_notifications(
+            [
+                Notification(
+                    user=self.user,
+                    notification_type="REORDER_CHECK",
+                    message="2 more items are below reorder level",
+                    content_type=ContentType.objects.get_for_model(Order),
+                    object_id=uuid.uuid4(),
+                )
+            ]
+        )
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get("/api/v1/notifications/stream/")
+        self.assertEqual(response.status_code, 401)
+
+    async def stream_ticket(self):
+        response = await AsyncClient().post(
+            "/api/v1/notifications/stream/ticket/",
+            headers={"authorization": f"Bearer {self.token}"},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["ticket"]
+
+    async def test_access_token_is_not_accepted_in_query(self):
+        response = await AsyncClient().get(
+            "/api/v1/notifications/stream/", {"token": self.token}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_ticket_opens_one_stream(self):
+        ticket = await self.stream_ticket()
+        response = await AsyncClient().get(
+            "/api/v1/notifications/stream/", {"ticket": ticket}
+        )
+        self.assertEqual(response.status_code, 200)
+        await aiter(response.streaming_content).aclose()
+
+        response = await AsyncClient().get(
+            "/api/v1/notifications/stream/", {"ticket": ticket}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_committed_notification_is_pushed(self):
+        response = await AsyncClient().get(
+            "/api/v1/notifications/stream/", {"ticket": await self.stream_ticket()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(
+                await next_event(stream), ("unread_count", {"unread": 0})
+            )
+
+            [notification] = await sync_to_async(self.notify)()
+
+            events = dict([await next_event(stream), await next_event(stream)])
+            self.assertEqual(events["unread_count"], {"unread": 1})
+            self.assertEqual(events["notification"]["id"], str(notification.pk))
+            self.assertEqual(events["notification"]["notification_type"], "REORDER_CHECK")
+        finally:
+            await stream.aclose()
@@ -3,11 +3,29 @@ from .views import (
     ListNotificationsView,
     MarkNotificationAsReadView,
     MarkAllNotificationsAsReadView,
+    NotificationReadStateView,
+    NotificationStreamTicketView,
+    NotificationStreamView,
 )
 
 
 urlpatterns = [
     path("notifications/", ListNotificationsView.as_view(), name="list_notifications"),
+    path(
+        "notifications/stream/",
+        NotificationStreamView.as_view(),
+        name="notification_stream",
+    ),
+    path(
+        "notifications/stream/ticket/",
+        NotificationStreamTicketView.as_view(),
+        name="notification_stream_ticket",
+    ),
+    path(
+        "notifications/read/",
+        NotificationReadStateView.as_view(),
+        name="notification_read_state",
+    ),
     path(
         "notifications/read-all/",
         MarkAllNotificationsAsReadView.as_view(),
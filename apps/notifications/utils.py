@@ -1,36 +1,305 @@
+import secrets
 from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
 from django.urls import reverse
+from .broker import get_broker
 from .models import Notification
+from .serializers import NotificationSerializer
 from ..orders.models import Order
 
+# Links are built outside a request, so they use the default API version
+API_VERSION = settings.REST_FRAMEWORK["DEFAULT_VERSION"]
+
 
 def check_upcoming_deliveries():
-    delivery_date = timezone.now().date() + timedelta(days=2)
-    upcoming_orders = Order.objects.filter(
-        delivery_date=delivery_date,
-        status="pending"
+    """
+    Remind owners of pending orders due in two days. Orders already reminded
+    today are skipped, so running it again the same day creates nothing.
+    Returns the number of reminders created.
+    """
+    today = timezone.localdate()
+    upcoming_orders = list(
+        Order.objects.filter(
+            delivery_date=today + timedelta(days=2), status="pending"
+        ).values_list("id", "created_by_id")
     )
+    if not upcoming_orders:
+        return 0
 
-    for order in upcoming_orders:
-        target_url = reverse("orders:order-detail", args=[order.id])
-        Notification.objects.create(
-            user=order.created_by,
+    content_type = ContentType.objects.get_for_model(Order)
+    already_reminded = set(
+        Notification.objects.filter(
             notification_type="DELIVERY_REMINDER",
-            message=f"Order #{order.id} is due for delivery in 2 days",
-            content_object=order,
-            target_url=target_url
+            content_type=content_type,
+            object_id__in=[order_id for order_id, _ in upcoming_orders],
+            # Folded reminders keep their created_at, so look at when they were last sent
+            updated_at__date=today,
+        ).values_list("object_id", flat=True)
+    )
+
+    reminders = create_notifications(
+        [
+            Notification(
+                user_id=user_id,
+                notification_type="DELIVERY_REMINDER",
+                message=f"Order #{order_id} is due for delivery in 2 days",
+                content_type=content_type,
+                object_id=order_id,
+                target_url=reverse(
+                    "api:orders-detail",
+                    kwargs={"version": API_VERSION, "pk": order_id},
+                ),
+            )
+            for order_id, user_id in upcoming_orders
+            if order_id not in already_reminded
+        ]
+    )
+    return len(reminders)
+
+
+def create_notifications(notifications):
+    """
+    Save unsaved notifications, folding each into an unread one of the same
+    type for the same user and object last seen within the coalescing window.
+    A folded notification takes the newer message and link and its count goes
+    up; its created_at is kept, so retention still runs from the first
+    occurrence. Returns the saved and folded notifications.
+    """
+    if not notifications:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            notification.coalesce_key: notification
+            for notification in Notification.objects.select_for_update()
+            .filter(
+                user_id__in={n.user_id for n in notifications},
+                notification_type__in={n.notification_type for n in notifications},
+                content_type_id__in={n.content_type_id for n in notifications},
+                object_id__in={n.object_id for n in notifications},
+                is_read=False,
+                updated_at__gte=now
+                - timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW),
+            )
+            # Later rows win, so repeats fold into the most recently seen match
+            .order_by("updated_at")
+        }
+
+        new, coalesced = [], {}
+        for notification in notifications:
+            match = existing.get(notification.coalesce_key)
+            if match is None:
+                existing[notification.coalesce_key] = notification
+                new.append(notification)
+                continue
+            match.count += notification.count
+            match.message = notification.message
+            match.target_url = notification.target_url
+            if not match._state.adding:
+                match.updated_at = now
+                coalesced[match.pk] = match
+
+        new = Notification.objects.bulk_create(new)
+        Notification.objects.bulk_update(
+            coalesced.values(),
+            ["count", "message", "target_url", "updated_at"],
+        )
+
+    announce_notifications(new, coalesced.values())
+    return new + list(coalesced.values())
+
+
+def purge_notifications(chunk_size=None):
+    """
+    Delete notifications older than their type's retention period, in chunks
+    so no single statement holds locks on a large part of the table. Each
+    chunk resumes after the last (created_at, id) deleted, so the
+    (notification_type, created_at) index is range-scanned instead of the
+    table being filtered again per chunk.
+    Returns the number deleted per type.
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_PURGE_CHUNK_SIZE
+    now = timezone.now()
+    deleted = {}
+    for notification_type, days in settings.NOTIFICATION_RETENTION_DAYS.items():
+        expired = Notification.objects.filter(
+            notification_type=notification_type,
+            created_at__lt=now - timedelta(days=days),
+        ).order_by("created_at", "id")
+        deleted[notification_type] = 0
+        last = None
+        while True:
+            with transaction.atomic():
+                chunk = expired
+                if last is not None:
+                    chunk = chunk.filter(
+                        Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]),
+                        created_at__gte=last[0],
+                    )
+                # Locked, so a notification marked read meanwhile is counted once
+                rows = list(
+                    chunk.select_for_update().values_list(
+                        "id", "created_at", "user_id", "is_read"
+                    )[:chunk_size]
+                )
+                if not rows:
+                    break
+                Notification.objects.filter(id__in=[row[0] for row in rows]).delete()
+                unread_per_user = {}
+                for _, _, user_id, is_read in rows:
+                    if not is_read:
+                        unread_per_user[user_id] = unread_per_user.get(user_id, 0) + 1
+                for user_id, unread in unread_per_user.items():
+                    adjust_unread_notification_count(user_id, -unread)
+            deleted[notification_type] += len(rows)
+            if len(rows) < chunk_size:
+                break
+            last = (rows[-1][1], rows[-1][0])
+    return deleted
+
+
+def announce_notifications(notifications, coalesced=()):
+    """
+    Count newly created unread notifications into their users' counters and
+    push them, along with any folded into existing ones, to connected
+    streams once the current transaction commits.
+    """
+    created_per_user = {}
+    for notification in notifications:
+        created_per_user[notification.user_id] = (
+            created_per_user.get(notification.user_id, 0) + 1
         )
-    
-    return upcoming_orders.count()
+    for user_id, created in created_per_user.items():
+        adjust_unread_notification_count(user_id, created)
+
+    events = [
+        (notification.user_id, NotificationSerializer(notification).data)
+        for notification in [*notifications, *coalesced]
+    ]
+
+    def push():
+        broker = get_broker()
+        for user_id, data in events:
+            broker.publish(user_id, "notification", data)
+
+    transaction.on_commit(push)
+
+
+def publish_unread_count(user_id, count):
+    get_broker().publish(user_id, "unread_count", {"unread": count})
 
 
-def invalidate_notification_cache(user_id):
-    cache.delete(f"user_{user_id}_unread_notifications")
+def get_unread_count_cache_key(user_id):
+    return f"user_{user_id}_unread_notifications"
 
 
-def update_notification_cache(user_id):
+def get_unread_notification_count(user_id):
+    """
+    The user's unread notification count. Read from the cached counter, so it
+    costs one cache GET; the database is only counted when the counter is missing.
+    """
+    key = get_unread_count_cache_key(user_id)
+    cached = cache.get(key)
+    if cached is not None and cached >= 0:
+        return cached
+
     count = Notification.objects.filter(user=user_id, is_read=False).count()
-    cache.set(f"user_{user_id}_unread_notifications", count, timeout=600)
-    return count
\ No newline at end of file
+    if cached is None:
+        # add() leaves a counter another worker rebuilt meanwhile untouched
+        cache.add(key, count, timeout=settings.NOTIFICATION_COUNT_CACHE_TIMEOUT)
+    else:
+        # Drifted below zero, so replace it outright
+        cache.set(key, count, timeout=settings.NOTIFICATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def adjust_unread_notification_count(user_id, delta):
+    """
+    Move the cached counter by `delta` once the current transaction commits.
+    A missing counter is rebuilt from the database. The new count is pushed
+    to the user's connected streams.
+    """
+    if not delta:
+        return
+
+    def adjust():
+        key = get_unread_count_cache_key(user_id)
+        try:
+            if delta > 0:
+                count = cache.incr(key, delta)
+            else:
+                count = cache.decr(key, -delta)
+        except ValueError:
+            count = get_unread_notification_count(user_id)
+        publish_unread_count(user_id, count)
+
+    transaction.on_commit(adjust)
+
+
+def set_unread_notification_count(user_id, count):
+    """Store a count already known to be exact, once the current transaction commits"""
+
+    def store():
+        cache.set(
+            get_unread_count_cache_key(user_id),
+            count,
+            timeout=settings.NOTIFICATION_COUNT_CACHE_TIMEOUT,
+        )
+        publish_unread_count(user_id, count)
+
+    transaction.on_commit(store)
+
+
+def mark_notifications_read(user_id, ids=None, until=None):
+    """
+    Mark the user's unread notifications read in one UPDATE: those in `ids`,
+    those created up to `until`, or all of them when neither is given.
+    Returns how many changed and keeps the unread counter in step.
+    """
+    queryset = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    if until is not None:
+        queryset = queryset.filter(created_at__lte=until)
+
+    updated_count = queryset.update(is_read=True, updated_at=timezone.now())
+    if ids is None and until is None:
+        set_unread_notification_count(user_id, 0)
+    else:
+        adjust_unread_notification_count(user_id, -updated_count)
+    return updated_count
+
+
+def get_stream_ticket_cache_key(ticket):
+    return f"notification_stream_ticket_{ticket}"
+
+
+def issue_stream_ticket(user_id):
+    """
+    A random ticket that opens one notification stream for the user. It
+    expires after NOTIFICATION_STREAM_TICKET_TTL seconds, so it is safe to
+    pass in the query string where the access token is not.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(
+        get_stream_ticket_cache_key(ticket),
+        str(user_id),
+        timeout=settings.NOTIFICATION_STREAM_TICKET_TTL,
+    )
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """The user id the ticket was issued to, or None. A ticket works once."""
+    key = get_stream_ticket_cache_key(ticket)
+    user_id = cache.get(key)
+    # Only the caller whose delete removed the ticket may use it
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
@@ -1,9 +1,27 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.generics import UpdateAPIView, ListAPIView, GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.utils import timezone
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, NotificationReadStateSerializer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .broker import get_broker
+from .utils import (
+    adjust_unread_notification_count,
+    get_unread_notification_count,
+    issue_stream_ticket,
+    mark_notifications_read,
+    redeem_stream_ticket,
+)
 
 
 class MarkNotificationAsReadView(UpdateAPIView):
@@ -27,8 +45,12 @@ class MarkNotificationAsReadView(UpdateAPIView):
 
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
+        # Only a notification that was still unread moves the counter
+        if Notification.objects.filter(pk=instance.pk, is_read=False).update(
+            is_read=True, updated_at=timezone.now()
+        ):
+            adjust_unread_notification_count(instance.user_id, -1)
         instance.is_read = True
-        instance.save()
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -52,7 +74,35 @@ class MarkAllNotificationsAsReadView(GenericAPIView):
         return base_queryset.select_related("user").order_by("-created_at")
 
     def post(self, request, *args, **kwargs):
-        updated_count = self.queryset.update(is_read=True)
+        updated_count = mark_notifications_read(request.user.id)
+        return Response(
+            {
+                "message": f"Marked {updated_count} notifications as read.",
+                "updated_count": updated_count,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class NotificationReadStateView(GenericAPIView):
+    """
+    Mark the user's notifications read in bulk with {"ids": [...]},
+    {"until": <created_at>} or {"all": true}.
+    """
+
+    permission_classes = [IsAuthenticated]
+    queryset = Notification.objects.none()
+    serializer_class = NotificationReadStateSerializer
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated_count = mark_notifications_read(
+            request.user.id,
+            ids=serializer.validated_data.get("ids"),
+            until=serializer.validated_data.get("until"),
+        )
         return Response(
             {
                 "message": f"Marked {updated_count} notifications as read.",
@@ -78,3 +128,84 @@ class ListNotificationsView(ListAPIView):
             else Notification.objects.filter(user=user)
         )
         return base_queryset.select_related("user").order_by("-created_at")
+
+
+class NotificationStreamTicketView(GenericAPIView):
+    """
+    Issue a short-lived ticket that opens one notification stream, to be
+    passed as ?ticket= since EventSource cannot set headers.
+    """
+
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        return Response(
+            {
+                "ticket": issue_stream_ticket(request.user.id),
+                "expires_in": settings.NOTIFICATION_STREAM_TICKET_TTL,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class NotificationStreamView(View):
+    """
+    Server-Sent Events stream of the user's new notifications and unread
+    count changes. Served under ASGI; authenticated by the Authorization
+    header or by a ticket from NotificationStreamTicketView as ?ticket=.
+    """
+
+    http_method_names = ["get"]
+
+    @staticmethod
+    def authenticate(request):
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            return None
+        if result is not None:
+            return result[0]
+        ticket = request.GET.get("ticket")
+        user_id = redeem_stream_ticket(ticket) if ticket else None
+        if user_id is None:
+            return None
+        return get_user_model().objects.filter(pk=user_id).first()
+
+    async def get(self, request, *args, **kwargs):
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None or not user.is_active:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        response = StreamingHttpResponse(
+            self.events(user.id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx and similar proxies from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    def format_event(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def events(self, user_id):
+        # Subscribe before reading the count, so no change falls in between
+        subscription = await get_broker().subscribe(user_id)
+        try:
+            count = await sync_to_async(get_unread_notification_count)(user_id)
+            yield self.format_event("unread_count", {"unread": count})
+            while True:
+                message = await subscription.get(
+                    timeout=settings.NOTIFICATION_STREAM_KEEPALIVE
+                )
+                if message is None:
+                    # Comment lines keep idle connections open through proxies
+                    yield ": keepalive\n\n"
+                else:
+                    yield self.format_event(*message)
+        finally:
+            await subscription.close()
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Start after the highest number the old save() logic handed out
+CREATE_SEQUENCE = """
+CREATE SEQUENCE IF NOT EXISTS orders_order_no_seq;
+SELECT setval(
+    'orders_order_no_seq',
+    COALESCE(
+        (
+            SELECT MAX(CAST(SUBSTRING(order_no FROM 5) AS bigint))
+            FROM orders_order
+            WHERE order_no ~ '^ORD-[0-9]+$'
+        ),
+        0
+    ) + 1,
+    false
+);
+"""
+
+DROP_SEQUENCE = "DROP SEQUENCE IF EXISTS orders_order_no_seq;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_profit_percentage_alter_order_profit'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEQUENCE, DROP_SEQUENCE),
+    ]
@@ -0,0 +1,58 @@
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def snapshot_existing_lines(apps, schema_editor):
+    """Existing lines take the recipe prices as they stand at migration time"""
+    OrderRecipe = apps.get_model("orders", "OrderRecipe")
+    RecipeInventory = apps.get_model("recipes", "RecipeInventory")
+
+    items = {}
+    for recipe_id, item_id, quantity, cost in RecipeInventory.objects.values_list(
+        "recipe_id", "inventory_item_id", "quantity", "cost"
+    ):
+        items.setdefault(recipe_id, {})[str(item_id)] = [str(quantity), str(cost)]
+
+    lines = list(OrderRecipe.objects.select_related("recipe"))
+    for line in lines:
+        recipe = line.recipe
+        line.unit_price = recipe.selling_price
+        line.unit_cost = recipe.cost_price
+        line.cost_breakdown = {
+            "ingredients": str(recipe.inventory_items_cost),
+            "labour": str(recipe.labour_cost),
+            "packaging": str(recipe.packaging_cost),
+            "overhead": str(recipe.overhead_cost),
+            "items": items.get(recipe.id, {}),
+        }
+    OrderRecipe.objects.bulk_update(
+        lines, ["unit_price", "unit_cost", "cost_breakdown"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_no_sequence'),
+        ('recipes', '0010_alter_recipe_options_alter_recipe_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderrecipe',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Recipe selling price when the line was created', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))]),
+        ),
+        migrations.AddField(
+            model_name='orderrecipe',
+            name='unit_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Recipe cost price when the line was created', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))]),
+        ),
+        migrations.AddField(
+            model_name='orderrecipe',
+            name='cost_breakdown',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-unit costs when the line was created: ingredients, labour, packaging, overhead and items as {inventory_item_id: [quantity, cost]}'),
+        ),
+        migrations.RunPython(snapshot_existing_lines, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F, Sum
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -49,10 +50,22 @@ class Order(BaseModel):
 
     def calculate_costs(self):
         """
-        Calculate the total value of the order based on the associated recipes.
+        Recalculate the order totals from its lines in one aggregate query.
+        Call after the lines change; saving the order does not recalculate.
         """
-        self.total_value = sum(recipe.selling_price for recipe in self.recipes.all())
-        total_cost_price = sum(recipe.cost_price for recipe in self.recipes.all())
+        totals = self.order_recipes.aggregate(
+            total_value=Sum("line_value"),
+            total_cost=Sum(
+                F("unit_cost") * F("quantity"),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        self.set_costs(totals["total_value"], totals["total_cost"])
+
+    def set_costs(self, total_value, total_cost_price):
+        """Set the totals from the summed line values and line costs"""
+        self.total_value = total_value or Decimal(0.00)
+        total_cost_price = total_cost_price or Decimal(0.00)
         self.profit = self.total_value - total_cost_price
         self.profit_percentage = (
             (self.profit / total_cost_price * 100)
@@ -60,19 +73,12 @@ class Order(BaseModel):
             else Decimal(0.00)
         )
 
-    def save(self, *args, **kwargs):
-        """
-        Override save method to calculate total_value before saving.
-        """
-        if not self.order_no:
-            last_order = Order.objects.order_by("created_at").last()
-            if last_order:
-                last_order_no = int(last_order.order_no.split("-")[-1])
-                self.order_no = f"ORD-{last_order_no + 1:05d}"
-            else:
-                self.order_no = "ORD-00001"
+    def update_costs(self):
+        """Recalculate the totals and write only those columns"""
         self.calculate_costs()
-        super().save(*args, **kwargs)
+        self.save(
+            update_fields=["total_value", "profit", "profit_percentage", "updated_at"]
+        )
 
 
 class OrderRecipe(models.Model):
@@ -90,15 +96,37 @@ class OrderRecipe(models.Model):
         default=Decimal(0.00),
         validators=[MinValueValidator(Decimal("0.00"))],
     )
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal(0.00),
+        validators=[MinValueValidator(Decimal("0.00"))],
+        help_text="Recipe selling price when the line was created",
+    )
+    unit_cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal(0.00),
+        validators=[MinValueValidator(Decimal("0.00"))],
+        help_text="Recipe cost price when the line was created",
+    )
+    cost_breakdown = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=(
+            "Per-unit costs when the line was created: ingredients, labour, "
+            "packaging, overhead and items as {inventory_item_id: [quantity, cost]}"
+        ),
+    )
 
     class Meta:
         unique_together = ("order", "recipe")
 
     def calculate_price(self):
         """
-        Calculate the total price for this order recipe based on the quantity and price per unit.
+        Calculate the total price for this order recipe from the snapshotted unit price.
         """
-        self.line_value = self.recipe.selling_price * self.quantity
+        self.line_value = self.unit_price * self.quantity
 
     def save(self, *args, **kwargs):
         """
@@ -106,14 +134,3 @@ class OrderRecipe(models.Model):
         """
         self.calculate_price()
         super().save(*args, **kwargs)
-
-    def update_inventory(self, user):
-        """
-        Update the inventory based on the quantity change.
-        This method should be called when the order recipe is created or updated.
-        """
-        recipe_ingredients = self.recipe.ingredients.all()
-        for ingredient in recipe_ingredients:
-            inventory = ingredient.inventory_item.inventory.get(created_by=user)
-            inventory.quantity -= ingredient.quantity * self.quantity
-            inventory.save()
@@ -2,8 +2,10 @@ from django.db import transaction
 from django.db.models import Q
 from rest_framework import serializers
 from djmoney.money import Money
+from ..dashboard.utils import invalidate_dashboard_cache
 from ..users.utils import get_user_preferrence_from_cache
 from .models import Order, Customer, Recipe, OrderRecipe
+from .services import OrderNumberService, OrderService, StockReservationService
 
 
 class OrderRecipeSerializer(serializers.ModelSerializer):
@@ -14,8 +16,8 @@ class OrderRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderRecipe
-        exclude = ["order"]
-        read_only_fields = ["id", "line_value", "order"]
+        exclude = ["order", "cost_breakdown"]
+        read_only_fields = ["id", "line_value", "unit_price", "unit_cost", "order"]
 
     def get_fields(self):
         fields = super().get_fields()
@@ -33,7 +35,7 @@ class OrderRecipeSerializer(serializers.ModelSerializer):
             Money(
                 amount=instance.line_value,
                 currency=get_user_preferrence_from_cache(
-                    self.context["request"].user, "currency", "USD"
+                    self.context["request"].user.id, "currency", "USD"
                 ),
             )
         )
@@ -46,6 +48,11 @@ class OrderSerializer(serializers.ModelSerializer):
     )
     order_recipes = OrderRecipeSerializer(many=True, read_only=True)
     customer = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all())
+    reject_unavailable = serializers.BooleanField(
+        default=False,
+        write_only=True,
+        help_text="Reject the order instead of flagging lines short of available stock",
+    )
 
     class Meta:
         model = Order
@@ -79,61 +86,93 @@ class OrderSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         currency = get_user_preferrence_from_cache(
-            self.context["request"].user, "currency", "USD"
+            self.context["request"].user.id, "currency", "USD"
         )
         representation["total_value"] = str(
             Money(amount=instance.total_value, currency=currency)
         )
         representation["profit"] = str(Money(amount=instance.profit, currency=currency))
         representation["profit_percentage"] = str(instance.profit_percentage) + "%"
+        # Set when the lines were just checked against available stock
+        if getattr(instance, "shortfalls", None):
+            representation["shortfalls"] = {
+                str(item_id): str(quantity)
+                for item_id, quantity in instance.shortfalls.items()
+            }
         return representation
 
     def create(self, validated_data):
         recipes = validated_data.pop("recipes")
+        reject_unavailable = validated_data.pop("reject_unavailable", False)
         validated_data["created_by"] = self.context["request"].user
+        validated_data["order_no"] = OrderNumberService.next()
 
         with transaction.atomic():
             order_instance = Order.objects.create(**validated_data)
-
-            order_recipes = [
-                OrderRecipe(
-                    order=order_instance,
-                    recipe_id=recipe["recipe_id"],
-                    quantity=recipe.get("quantity", 1),
-                )
-                for recipe in recipes
-            ]
-            OrderRecipe.objects.bulk_create(order_recipes)
-            order_instance.save()
+            order_recipes = self._create_order_recipes(order_instance, recipes)
+            self._reserve(order_instance, order_recipes, reject_unavailable)
+            order_instance.update_costs()
+            invalidate_dashboard_cache(order_instance.created_by_id)
             return order_instance
 
     def update(self, instance, validated_data):
         recipes = validated_data.pop("recipes", None)
+        reject_unavailable = validated_data.pop("reject_unavailable", False)
         validated_data["created_by"] = self.context["request"].user
+        # Finished orders are counted in the daily rollup and keep the prices
+        # they were sold at, so their lines are fixed
+        if recipes is not None and instance.status != "pending":
+            raise serializers.ValidationError(
+                {"recipes": f"Cannot change the recipes of a {instance.status} order."}
+            )
 
         with transaction.atomic():
             instance = super().update(instance, validated_data)
 
             if recipes is not None:
-                existing_recipes = set(
-                    instance.order_recipes.values_list("id", flat=True)
-                )
-                new_recipes = []
-
-                for recipe in recipes:
-                    new_recipes.append(
-                        OrderRecipe(
-                            order=instance,
-                            recipe_id=recipe["recipe_id"],
-                            quantity=recipe.get("quantity", 1),
-                        )
-                    )
-                OrderRecipe.objects.bulk_create(new_recipes)
-
-                # Remove recipes that are no longer in the new list
-                if existing_recipes:
-                    OrderRecipe.objects.filter(id__in=existing_recipes).delete()
-
-                instance.save()
+                # Clear the old lines first so a recipe can be kept on the order
+                instance.order_recipes.all().delete()
+                order_recipes = self._create_order_recipes(instance, recipes)
+                self._reserve(instance, order_recipes, reject_unavailable)
+                instance.update_costs()
+            invalidate_dashboard_cache(instance.created_by_id)
 
         return instance
+
+    @staticmethod
+    def _reserve(order, order_recipes, reject_unavailable):
+        """
+        Check the lines against available stock, then reserve them. Short
+        items are flagged on the order, or rejected when asked to. The stock
+        rows stay locked until the caller's transaction commits.
+        """
+        StockReservationService.release([order])
+        demand = StockReservationService.demand(order_recipes)
+        StockReservationService.lock_stock(order.created_by, demand.keys())
+        shortfalls = StockReservationService.shortfalls(order.created_by, demand)
+        if shortfalls and reject_unavailable:
+            raise serializers.ValidationError(
+                {
+                    "shortfalls": {
+                        str(item_id): str(quantity)
+                        for item_id, quantity in shortfalls.items()
+                    }
+                }
+            )
+        order.shortfalls = shortfalls
+        StockReservationService.reserve([order])
+
+    @staticmethod
+    def _create_order_recipes(order, recipes):
+        """Bulk create the order lines with their prices snapshotted"""
+        order_recipes = OrderService.price_lines(
+            [
+                OrderRecipe(
+                    order=order,
+                    recipe_id=recipe["recipe_id"],
+                    quantity=int(recipe.get("quantity", 1)),
+                )
+                for recipe in recipes
+            ]
+        )
+        return OrderRecipe.objects.bulk_create(order_recipes)
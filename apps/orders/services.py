@@ -1,32 +1,596 @@
-from django.db.models import F
+import csv
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models import F, Sum
 from django.urls import reverse
+from django.utils import timezone
+from ..dashboard.services import DailyOrderStatsService
+from ..dashboard.utils import invalidate_dashboard_cache
+from ..jobs.services import JobService
 from ..notifications.models import Notification
-from ..inventory.models import Inventory
-from ..recipes.models import RecipeInventory
+from ..notifications.utils import create_notifications
+from ..inventory.models import Inventory, InventoryHistory, StockReservation
+from ..inventory.services import StockAvailabilityService, StockLedgerService
+from ..customers.models import Customer
+from ..recipes.models import Recipe, RecipeInventory
+from .models import Order, OrderRecipe
 
+REORDER_CHECK_JOB = "orders.check_reorder_levels"
+
+# Created in migration 0004_order_no_sequence
+ORDER_NO_SEQUENCE = "orders_order_no_seq"
+
+
+class OrderNumberService:
+    """
+    Hands out order numbers from a Postgres sequence. nextval() takes no row
+    locks and is never rolled back, so concurrent creates cannot collide and
+    a failed create only leaves a gap in the numbering.
+    """
+
+    PREFIX = "ORD-"
+
+    @classmethod
+    def allocate(cls, count=1):
+        """Reserve `count` order numbers in one statement, in ascending order"""
+        if count < 1:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                [ORDER_NO_SEQUENCE, count],
+            )
+            numbers = sorted(row[0] for row in cursor.fetchall())
+        return [f"{cls.PREFIX}{number:05d}" for number in numbers]
+
+    @classmethod
+    def next(cls):
+        return cls.allocate()[0]
+
+
+class StockReservationService:
+    """
+    Keeps StockReservation rows in step with pending orders. Each change
+    touches only the orders involved, so checking what can still be promised
+    never rescans the other pending orders.
+    """
+
+    @staticmethod
+    def demand(order_recipes):
+        """
+        {inventory_item_id: quantity} needed by unsaved or saved order lines,
+        from one query over the ingredients of their recipes.
+        """
+        quantities = {}
+        for line in order_recipes:
+            recipe_id = str(line.recipe_id)
+            quantities[recipe_id] = quantities.get(recipe_id, 0) + line.quantity
+        demand = {}
+        for recipe_id, item_id, quantity in RecipeInventory.objects.filter(
+            recipe_id__in=quantities.keys()
+        ).values_list("recipe_id", "inventory_item_id", "quantity"):
+            demand[item_id] = (
+                demand.get(item_id, 0) + quantity * quantities[str(recipe_id)]
+            )
+        return demand
+
+    @staticmethod
+    def lock_stock(user, item_ids):
+        """
+        Lock the user's stock rows for the items until the transaction ends,
+        so availability checked after this cannot be promised twice
+        """
+        # Same order as StockLedgerService, so the two cannot deadlock
+        list(
+            Inventory.objects.filter(created_by=user, inventory_item_id__in=item_ids)
+            .select_for_update()
+            .order_by("inventory_item_id")
+            .values_list("pk", flat=True)
+        )
+
+    @staticmethod
+    def shortfalls(user, demand):
+        """{inventory_item_id: quantity short} where demand exceeds what is available"""
+        available = StockAvailabilityService.available(user, demand.keys())
+        return {
+            item_id: quantity - available[item_id]
+            for item_id, quantity in demand.items()
+            if quantity > available[item_id]
+        }
+
+    @staticmethod
+    def reserve(orders):
+        """Replace the reservations of the orders with their current demand"""
+        order_ids = [order.pk for order in orders]
+        owners = {order.pk: order.created_by_id for order in orders}
+        StockReservation.objects.filter(order_id__in=order_ids).delete()
+        StockReservation.objects.bulk_create(
+            [
+                StockReservation(
+                    order_id=row["recipe__order_recipes__order_id"],
+                    inventory_item_id=row["inventory_item_id"],
+                    quantity=row["total"],
+                    created_by_id=owners[row["recipe__order_recipes__order_id"]],
+                )
+                for row in RecipeInventory.objects.filter(
+                    recipe__order_recipes__order__in=order_ids
+                )
+                .values("recipe__order_recipes__order_id", "inventory_item_id")
+                .annotate(
+                    total=Sum(F("quantity") * F("recipe__order_recipes__quantity"))
+                )
+            ]
+        )
+
+    @staticmethod
+    def release(orders):
+        StockReservation.objects.filter(
+            order_id__in=[order.pk for order in orders]
+        ).delete()
+
+
+class OrderService:
+    @staticmethod
+    def price_lines(order_recipes):
+        """
+        Snapshot the current recipe prices and costs onto unsaved OrderRecipe
+        lines, so later recipe changes do not alter the order or its reports.
+        Uses one query for the recipes and one for their ingredients however
+        many lines there are. Returns the lines ready for bulk_create.
+        """
+        recipe_ids = {line.recipe_id for line in order_recipes}
+        recipes = {
+            str(recipe["id"]): recipe
+            for recipe in Recipe.objects.filter(id__in=recipe_ids).values(
+                "id",
+                "selling_price",
+                "cost_price",
+                "inventory_items_cost",
+                "labour_cost",
+                "packaging_cost",
+                "overhead_cost",
+            )
+        }
+        items = {}
+        for recipe_id, item_id, quantity, cost in RecipeInventory.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list("recipe_id", "inventory_item_id", "quantity", "cost"):
+            items.setdefault(str(recipe_id), {})[str(item_id)] = [
+                str(quantity),
+                str(cost),
+            ]
+
+        for line in order_recipes:
+            recipe = recipes.get(str(line.recipe_id))
+            if recipe is None:
+                continue
+            line.unit_price = recipe["selling_price"]
+            line.unit_cost = recipe["cost_price"]
+            line.cost_breakdown = {
+                "ingredients": str(recipe["inventory_items_cost"]),
+                "labour": str(recipe["labour_cost"]),
+                "packaging": str(recipe["packaging_cost"]),
+                "overhead": str(recipe["overhead_cost"]),
+                "items": items.get(str(line.recipe_id), {}),
+            }
+            line.calculate_price()
+        return order_recipes
+
+    STATUSES = ("pending", "completed", "cancelled")
+    TRANSITION_ERRORS = {
+        ("cancelled", "completed"): "Cannot complete a cancelled order.",
+        ("completed", "cancelled"): "Cannot cancel a completed order.",
+        ("completed", "pending"): "Cannot revert a completed order to pending.",
+        ("cancelled", "pending"): "Cannot revert a cancelled order to pending.",
+    }
+
+    @classmethod
+    def transition_error(cls, current_status, new_status):
+        """Why an order cannot move between the statuses, or None if it can"""
+        if new_status not in cls.STATUSES:
+            return "Invalid status."
+        if current_status == new_status:
+            return "Order status is already set to this value."
+        return cls.TRANSITION_ERRORS.get((current_status, new_status))
+
+    @staticmethod
+    def lock_pending(orders):
+        """
+        Lock the orders that are still pending, in primary key order so
+        concurrent callers cannot deadlock, and return only those. Call
+        inside a transaction; orders another request has already moved
+        are left out, so no order is completed or cancelled twice.
+        """
+        pending = set(
+            Order.objects.select_for_update()
+            .filter(pk__in=[order.pk for order in orders], status="pending")
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        return [order for order in orders if order.pk in pending]
+
+    @classmethod
+    def set_status(cls, orders, new_status):
+        """
+        Change the status of pending orders other than completing them.
+        Returns the orders that changed.
+        """
+        with transaction.atomic():
+            orders = cls.lock_pending(orders)
+            if not orders:
+                return []
+            Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            for order in orders:
+                order.status = new_status
+            if new_status == "cancelled":
+                StockReservationService.release(orders)
+                DailyOrderStatsService.record_cancelled([order.pk for order in orders])
+            for owner_id in {order.created_by_id for order in orders}:
+                invalidate_dashboard_cache(owner_id)
+        return orders
 
-class OrderNotificationService:
     @classmethod
-    def check_reorder_levels(cls, order):
-        """Check reorder levels after order completion"""
-        # Get all InventoryItems used in the order
-        inventory_item_ids = RecipeInventory.objects.filter(
-            recipe__order_recipes__order=order
-        ).values_list("inventory_item_id", flat=True).distinct()
-
-        # Check which are below reorder level
+    def complete_order(cls, order, user):
+        """Complete one order; returns it, or None if it was no longer pending"""
+        completed = cls.complete_orders([order], user)
+        return completed[0] if completed else None
+
+    @classmethod
+    def complete_orders(cls, orders, user):
+        """
+        Deduct the ingredients used by the orders through the stock ledger,
+        record the removals and mark them completed. Demand is summed across
+        every line of every order in one query and applied in one ledger
+        write, so the statement count does not grow with the number of
+        orders or lines. Raises InsufficientStock if any item is short.
+        Only orders still pending once locked are completed; returns those.
+        """
+        today = timezone.now().date()
+
+        with transaction.atomic():
+            orders = cls.lock_pending(orders)
+            if not orders:
+                return []
+            order_ids = [order.pk for order in orders]
+            requirements = dict(
+                RecipeInventory.objects.filter(
+                    recipe__order_recipes__order__in=order_ids
+                )
+                .values("inventory_item_id")
+                .annotate(
+                    total=Sum(F("quantity") * F("recipe__order_recipes__quantity"))
+                )
+                .values_list("inventory_item_id", "total")
+            )
+            # Only the status changes, so write just that column
+            Order.objects.filter(pk__in=order_ids).update(
+                status="completed", updated_at=timezone.now()
+            )
+            for order in orders:
+                order.status = "completed"
+            StockReservationService.release(orders)
+            DailyOrderStatsService.record_completed(order_ids)
+            for owner_id in {order.created_by_id for order in orders}:
+                invalidate_dashboard_cache(owner_id)
+            InventoryHistory.objects.bulk_create(
+                [
+                    InventoryHistory(
+                        inventory_item_id=item_id,
+                        quantity=quantity,
+                        is_addition=False,
+                        incident_date=today,
+                        created_by=user,
+                    )
+                    for item_id, quantity in requirements.items()
+                ]
+            )
+            OrderNotificationService.schedule_reorder_check(
+                user, requirements.keys(), orders[-1]
+            )
+            # Stock goes last so its rows stay locked only until the commit
+            StockLedgerService.apply(
+                user,
+                requirements.keys(),
+                lambda stock: {
+                    item_id: -quantity for item_id, quantity in requirements.items()
+                },
+            )
+        return orders
+
+
+class OrderNotificationService:
+    @staticmethod
+    def schedule_reorder_check(user, item_ids, order):
+        """
+        Queue a delayed reorder check for the items. Each user has one
+        pending check per window; items touched while it waits are merged
+        into it, so the window produces a single notification.
+        """
+        JobService.enqueue_merged(
+            REORDER_CHECK_JOB,
+            str(user.id),
+            {
+                "user_id": str(user.id),
+                "inventory_item_ids": [str(item_id) for item_id in item_ids],
+                "order_id": str(order.pk),
+            },
+            merge_field="inventory_item_ids",
+            run_after=timezone.now()
+            + timedelta(seconds=settings.REORDER_CHECK_DELAY),
+        )
+
+    @staticmethod
+    def check_reorder_levels(user_id, item_ids, order_id):
+        """Notify once if any of the items are at or below their reorder level"""
         low_stock_count = Inventory.objects.filter(
-            created_by=order.created_by,
-            invetory_item_id__in=inventory_item_ids,
-            quantity__lte=F("reorder_level")
+            created_by_id=user_id,
+            inventory_item_id__in=item_ids,
+            quantity__lte=F("reorder_level"),
         ).count()
 
         if low_stock_count > 0:
-            target_url = reverse("inventory-stock-list") + "?below_reorder=true"
-            Notification.objects.create(
-                user=order.created_by,
-                notification_type="REORDER_CHECK",
-                message=f"{low_stock_count} more items are below reorder level",
-                content_object=order,
-                target_url=target_url
-            )
\ No newline at end of file
+            target_url = (
+                reverse(
+                    "api:inventory-stock-list",
+                    kwargs={"version": settings.REST_FRAMEWORK["DEFAULT_VERSION"]},
+                )
+                + "?below_reorder=true"
+            )
+            create_notifications(
+                [
+                    Notification(
+                        user_id=user_id,
+                        notification_type="REORDER_CHECK",
+                        message=f"{low_stock_count} more items are below reorder level",
+                        content_type=ContentType.objects.get_for_model(Order),
+                        object_id=order_id,
+                        target_url=target_url,
+                    )
+                ]
+            )
+
+
+class OrderImportService:
+    """
+    Create many orders in one request from a JSON array or CSV rows.
+    Customers and recipes are resolved with one query each, order numbers
+    are reserved as a block and orders and lines go in with one bulk_create
+    each, however many orders there are.
+    """
+
+    MAX_ORDERS = 1000
+    CSV_FIELDS = ("order_ref", "customer", "delivery_date", "recipe_id", "quantity")
+
+    @staticmethod
+    def read_csv(lines):
+        """
+        Group CSV rows into orders. Each row is one line of an order; rows
+        sharing an order_ref belong to the same order, which takes its
+        customer and delivery_date from its first row.
+        """
+        reader = csv.DictReader(
+            line.decode("utf-8-sig") if isinstance(line, bytes) else line
+            for line in lines
+        )
+        orders = {}
+        for row in reader:
+            ref = (row.get("order_ref") or "").strip()
+            order = orders.setdefault(
+                ref or f"row-{reader.line_num}",
+                {
+                    "customer": row.get("customer"),
+                    "delivery_date": row.get("delivery_date"),
+                    "recipes": [],
+                },
+            )
+            order["recipes"].append(
+                {"recipe_id": row.get("recipe_id"), "quantity": row.get("quantity")}
+            )
+        return list(orders.values())
+
+    @classmethod
+    def create_orders(cls, user, raw_orders):
+        """
+        Validate and create the orders. Valid orders are created together and
+        invalid ones are reported by their position in the input.
+        """
+        cleaned = []
+        errors = []
+        for index, raw in enumerate(raw_orders):
+            order, order_errors = cls._clean_order(raw)
+            if order_errors:
+                errors.append({"order": index, "errors": order_errors})
+            else:
+                cleaned.append((index, order))
+
+        # One lookup for each related set
+        known_customers = set(
+            Customer.objects.filter(
+                Q(is_active=True) | Q(created_by=user),
+                id__in={order["customer"] for _, order in cleaned},
+            ).values_list("id", flat=True)
+        )
+        known_recipes = set(
+            Recipe.objects.filter(
+                Q(is_active=True) | Q(created_by=user),
+                id__in={
+                    recipe_id for _, order in cleaned for recipe_id in order["recipes"]
+                },
+            ).values_list("id", flat=True)
+        )
+
+        valid = []
+        for index, order in cleaned:
+            order_errors = {}
+            if order["customer"] not in known_customers:
+                order_errors["customer"] = (
+                    f"Customer with id {order['customer']} does not exist."
+                )
+            missing = [str(r) for r in order["recipes"] if r not in known_recipes]
+            if missing:
+                order_errors["recipes"] = f"Recipes do not exist: {', '.join(missing)}."
+            if order_errors:
+                errors.append({"order": index, "errors": order_errors})
+            else:
+                valid.append(order)
+
+        created = cls._bulk_create(user, valid) if valid else []
+        errors.sort(key=lambda error: error["order"])
+        return {
+            "created": len(created),
+            "failed": len(errors),
+            "orders": [{"id": order.id, "order_no": order.order_no} for order in created],
+            "errors": errors,
+        }
+
+    @staticmethod
+    def _clean_order(raw):
+        """Parse a raw order, returning field errors instead of raising"""
+        if not isinstance(raw, dict):
+            return None, "Malformed order."
+        order = {}
+        errors = {}
+
+        try:
+            order["customer"] = uuid.UUID(str(raw.get("customer") or "").strip())
+        except ValueError:
+            errors["customer"] = "A valid UUID is required."
+
+        delivery_date = str(raw.get("delivery_date") or "").strip()
+        try:
+            order["delivery_date"] = (
+                date.fromisoformat(delivery_date) if delivery_date else None
+            )
+        except ValueError:
+            errors["delivery_date"] = "Date must be in YYYY-MM-DD format."
+
+        recipes = raw.get("recipes")
+        if not isinstance(recipes, list) or not recipes:
+            errors["recipes"] = "At least one recipe is required."
+            return order, errors
+
+        # Repeated recipes are merged, an order holds each recipe once
+        order["recipes"] = {}
+        for line in recipes:
+            try:
+                recipe_id = uuid.UUID(str(line.get("recipe_id") or "").strip())
+                quantity = int(str(line.get("quantity") or "1").strip())
+                if quantity < 1:
+                    raise ValueError
+            except (AttributeError, ValueError):
+                errors["recipes"] = (
+                    "Each recipe needs a valid recipe_id and a positive whole quantity."
+                )
+                break
+            order["recipes"][recipe_id] = order["recipes"].get(recipe_id, 0) + quantity
+        return order, errors
+
+    @staticmethod
+    def _bulk_create(user, orders):
+        order_numbers = OrderNumberService.allocate(len(orders))
+        instances = []
+        lines = []
+        for order, order_no in zip(orders, order_numbers):
+            instance = Order(
+                order_no=order_no,
+                customer_id=order["customer"],
+                delivery_date=order["delivery_date"],
+                created_by=user,
+            )
+            instances.append(instance)
+            lines.extend(
+                OrderRecipe(order=instance, recipe_id=recipe_id, quantity=quantity)
+                for recipe_id, quantity in order["recipes"].items()
+            )
+        OrderService.price_lines(lines)
+
+        totals = {}
+        for line in lines:
+            value, cost = totals.get(line.order.id, (0, 0))
+            totals[line.order.id] = (
+                value + line.line_value,
+                cost + line.unit_cost * line.quantity,
+            )
+        for instance in instances:
+            instance.set_costs(*totals[instance.id])
+
+        with transaction.atomic():
+            Order.objects.bulk_create(instances)
+            OrderRecipe.objects.bulk_create(lines)
+            StockReservationService.reserve(instances)
+            invalidate_dashboard_cache(user.id)
+        return instances
+
+
+class OrderPlanningService:
+    """
+    Material requirements for pending orders. Demand is grouped by delivery
+    date and item in SQL, then a running total per item is compared with
+    the stock on hand to show when each item runs short.
+    """
+
+    @staticmethod
+    def requirements(user, until=None):
+        """
+        Return one entry per delivery date (undated orders last) listing the
+        items needed that day, the running total needed up to that day, the
+        quantity on hand and how much is short by then.
+        """
+        # One filter() call so every condition applies to the same order line
+        conditions = {
+            "recipe__order_recipes__order__created_by": user,
+            "recipe__order_recipes__order__status": "pending",
+        }
+        if until:
+            conditions["recipe__order_recipes__order__delivery_date__lte"] = until
+        demand = (
+            RecipeInventory.objects.filter(**conditions)
+            .values(
+                "recipe__order_recipes__order__delivery_date",
+                "inventory_item_id",
+                "inventory_item__name",
+            )
+            .annotate(required=Sum(F("quantity") * F("recipe__order_recipes__quantity")))
+            .order_by(
+                F("recipe__order_recipes__order__delivery_date").asc(nulls_last=True),
+                "inventory_item__name",
+            )
+        )
+        demand = list(demand)
+
+        on_hand = dict(
+            Inventory.objects.filter(
+                created_by=user,
+                is_active=True,
+                inventory_item_id__in={row["inventory_item_id"] for row in demand},
+            ).values_list("inventory_item_id", "quantity")
+        )
+
+        days = []
+        cumulative = {}
+        for row in demand:
+            delivery_date = row["recipe__order_recipes__order__delivery_date"]
+            if not days or days[-1]["delivery_date"] != delivery_date:
+                days.append({"delivery_date": delivery_date, "items": []})
+
+            item_id = row["inventory_item_id"]
+            cumulative[item_id] = cumulative.get(item_id, 0) + row["required"]
+            available = on_hand.get(item_id, Decimal(0))
+            days[-1]["items"].append(
+                {
+                    "inventory_item_id": item_id,
+                    "name": row["inventory_item__name"],
+                    "required": row["required"],
+                    "cumulative_required": cumulative[item_id],
+                    "on_hand": available,
+                    "shortfall": max(cumulative[item_id] - available, Decimal(0)),
+                }
+            )
+        return days
@@ -0,0 +1,18 @@
+from collections import defaultdict
+from ..jobs.services import register
+from .services import OrderNotificationService, REORDER_CHECK_JOB
+
+
+@register(REORDER_CHECK_JOB)
+def check_reorder_levels(payloads):
+    """Run one reorder check per user for every item queued in the batch"""
+    item_ids_by_user = defaultdict(set)
+    order_by_user = {}
+    for payload in payloads:
+        item_ids_by_user[payload["user_id"]].update(payload["inventory_item_ids"])
+        order_by_user[payload["user_id"]] = payload["order_id"]
+
+    for user_id, item_ids in item_ids_by_user.items():
+        OrderNotificationService.check_reorder_levels(
+            user_id, item_ids, order_by_user[user_id]
+        )
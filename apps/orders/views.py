@@ -1,10 +1,16 @@
+from datetime import date
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from django.db.models import Prefetch
+from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from ..common.imports import import_errors, import_source
 from .serializers import OrderSerializer, Order, OrderRecipe
+from .services import OrderImportService, OrderPlanningService, OrderService
 
 
 class OrderViewSet(ModelViewSet):
@@ -14,6 +20,7 @@ class OrderViewSet(ModelViewSet):
     http_method_names = ["get", "post", "patch"]
     search_fields = ["customer__name", "order_no"]
     filterset_fields = ["status", "delivery_date", "created_at"]
+    MAX_BULK_STATUS = 1000
 
     def get_queryset(self):
         user = self.request.user
@@ -46,46 +53,176 @@ class OrderViewSet(ModelViewSet):
     @action(methods=["patch"], detail=True, url_path="update-status")
     def update_status(self, request, pk=None, **kwargs):
         order = self.get_object()
-        user = self.request.user
         new_status = request.data.get("status")
 
-        if new_status not in ["pending", "completed", "cancelled"]:
-            return Response({"detail": "Invalid status."}, status=400)
-        if order.status == new_status:
+        error = OrderService.transition_error(order.status, new_status)
+        if error:
+            return Response({"detail": error}, status=400)
+
+        if new_status == "completed":
+            # Stock comes out of the owner's inventory, even for a superuser
+            changed = OrderService.complete_order(order, order.created_by)
+        else:
+            changed = OrderService.set_status([order], new_status)
+        if not changed:
+            # Another request moved the order after it was read
             return Response(
-                {"detail": "Order status is already set to this value."}, status=400
+                {"detail": "Order is no longer pending."},
+                status=status.HTTP_409_CONFLICT,
             )
 
-        if new_status == "completed":
-            if order.status == "cancelled":
-                return Response(
-                    {"detail": "Cannot complete a cancelled order."}, status=400
-                )
-        elif new_status == "cancelled":
-            if order.status == "completed":
-                return Response(
-                    {"detail": "Cannot cancel a completed order."}, status=400
-                )
-        elif new_status == "pending":
-            if order.status == "completed":
-                return Response(
-                    {"detail": "Cannot revert a completed order to pending."},
-                    status=400,
-                )
-            elif new_status == "cancelled":
-                return Response(
-                    {"detail": "Cannot revert a cancelled order to pending."},
-                    status=400,
+        serializer = self.get_serializer(order)
+        return Response(serializer.data, status=200)
+
+    @action(methods=["post"], detail=False, url_path="bulk")
+    def create_bulk(self, request, *args, **kwargs):
+        """
+        Create up to 1000 orders at once from a JSON array of orders
+        ({customer, delivery_date, recipes: [{recipe_id, quantity}]}), a
+        text/csv body or a multipart upload named "file". CSV headers:
+        order_ref, customer, delivery_date, recipe_id, quantity, with one row
+        per order line. Valid orders are created and invalid ones reported.
+        """
+        source = import_source(
+            request,
+            {"text/csv": "csv", "application/json": "json"},
+            upload_default="csv",
+        )
+        if source is None:
+            return Response(
+                {"error": "Send a JSON array, text/csv or a file upload."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        data_format, lines = source
+        if data_format == "csv":
+            with import_errors():
+                orders = OrderImportService.read_csv(lines)
+        else:
+            orders = request.data
+            if not isinstance(orders, list):
+                raise ValidationError({"error": "Send a JSON array of orders."})
+
+        if not orders:
+            raise ValidationError({"error": "No orders were provided."})
+        if len(orders) > OrderImportService.MAX_ORDERS:
+            raise ValidationError(
+                {
+                    "error": f"At most {OrderImportService.MAX_ORDERS} orders "
+                    "can be created at once."
+                }
+            )
+
+        report = OrderImportService.create_orders(request.user, orders)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(methods=["post"], detail=False, url_path="bulk-status")
+    def bulk_status(self, request, *args, **kwargs):
+        """
+        Move many orders to one status: {"ids": [...], "status": "..."}.
+        Orders that cannot make the transition are reported and the rest are
+        changed together. Completions deduct their combined ingredients in
+        one stock write per owner, so either all of them complete or none do.
+        """
+        new_status = request.data.get("status")
+        ids = request.data.get("ids")
+        if new_status not in OrderService.STATUSES:
+            raise ValidationError({"status": "Invalid status."})
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({"ids": "A list of order ids is required."})
+        if len(ids) > self.MAX_BULK_STATUS:
+            raise ValidationError(
+                {"ids": f"At most {self.MAX_BULK_STATUS} orders can be changed at once."}
+            )
+
+        user = request.user
+        base_queryset = (
+            Order.objects.all()
+            if user.is_superuser
+            else Order.objects.filter(created_by=user)
+        )
+        try:
+            orders = {
+                str(order.pk): order
+                for order in base_queryset.filter(id__in=ids).select_related(
+                    "created_by"
                 )
+            }
+        except DjangoValidationError:
+            raise ValidationError({"ids": "Every id must be a valid UUID."})
 
-        if new_status == "completed":
-            with transaction.atomic():
-                order_recipes = order.order_recipes.all()
-                for order_recipe in order_recipes:
-                    order_recipe.update_inventory(user)
+        changing = []
+        errors = []
+        for order_id in dict.fromkeys(str(order_id) for order_id in ids):
+            order = orders.get(order_id)
+            error = (
+                OrderService.transition_error(order.status, new_status)
+                if order
+                else "Order not found."
+            )
+            if error:
+                errors.append({"id": order_id, "detail": error})
+            else:
+                changing.append(order)
 
-        order.status = new_status
-        order.save()
+        changed = []
+        if changing:
+            if new_status == "completed":
+                # Each owner's orders draw on that owner's stock; a superuser
+                # may be closing orders for several users at once
+                by_owner = {}
+                for order in changing:
+                    by_owner.setdefault(order.created_by_id, []).append(order)
+                with transaction.atomic():
+                    for owner_orders in by_owner.values():
+                        changed += OrderService.complete_orders(
+                            owner_orders, owner_orders[0].created_by
+                        )
+            else:
+                changed = OrderService.set_status(changing, new_status)
+            # Orders another request moved after they were read are skipped
+            changed_ids = {order.pk for order in changed}
+            errors += [
+                {"id": str(order.pk), "detail": "Order is no longer pending."}
+                for order in changing
+                if order.pk not in changed_ids
+            ]
 
-        serializer = self.get_serializer(order)
-        return Response(serializer.data, status=200)
+        return Response(
+            {
+                "updated": [order.pk for order in changed],
+                "errors": errors,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(methods=["get"], detail=False, url_path="requirements")
+    def requirements(self, request, *args, **kwargs):
+        """
+        Ingredients needed by pending orders per delivery date, with the
+        running shortfall against current stock. Optional ?until=YYYY-MM-DD.
+        """
+        until = request.query_params.get("until")
+        if until:
+            try:
+                until = date.fromisoformat(until)
+            except ValueError:
+                raise ValidationError(
+                    {"until": "Date must be in YYYY-MM-DD format."}
+                )
+
+        days = OrderPlanningService.requirements(request.user, until)
+        return Response(
+            {
+                "days": days,
+                "short_items": len(
+                    {
+                        item["inventory_item_id"]
+                        for day in days
+                        for item in day["items"]
+                        if item["shortfall"] > 0
+                    }
+                ),
+            },
+            status=status.HTTP_200_OK,
+        )
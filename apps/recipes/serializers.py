@@ -46,7 +46,7 @@ class RecipeIventorySerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         currency = get_user_preferrence_from_cache(
-            self.context["request"].user, "currency", "USD"
+            self.context["request"].user.id, "currency", "USD"
         )
         representation["cost"] = str(Money(instance.cost, currency))
         representation["quantity"] = (
@@ -137,7 +137,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         representation["profit_margin"] = str(instance.profit_margin) + "%"
         currency = get_user_preferrence_from_cache(
-            self.context["request"].user, "currency", "USD"
+            self.context["request"].user.id, "currency", "USD"
         )
         money_fields = [
             "cost_price",
@@ -197,7 +197,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         representation["profit_margin"] = str(instance.profit_margin) + "%"
         currency = get_user_preferrence_from_cache(
-            self.context["request"].user, "currency", "USD"
+            self.context["request"].user.id, "currency", "USD"
         )
         money_fields = [
             "inventory_items_cost",
@@ -2,6 +2,7 @@ from django.db import transaction
 from django.db.models import OuterRef, Subquery, F, Sum
 from .models import Recipe, RecipeInventory
 from ..inventory.models import Inventory
+from ..dashboard.utils import invalidate_dashboard_cache
 from ..users.utils import get_user_preferrence_from_cache
 
 
@@ -13,10 +14,10 @@ class RecipeService:
         # Set defaults
         validated_data.setdefault(
             "profit_margin",
-            get_user_preferrence_from_cache(user, "profit_margin", 30.00),
+            get_user_preferrence_from_cache(user.id, "profit_margin", 30.00),
         )
         validated_data.setdefault(
-            "profit_margin", get_user_preferrence_from_cache(user, "labour_rate", 20.00)
+            "profit_margin", get_user_preferrence_from_cache(user.id, "labour_rate", 20.00)
         )
 
         with transaction.atomic():
@@ -39,6 +40,7 @@ class RecipeService:
 
             recipe.refresh_from_db()
             recipe.calculate_cost()
+            invalidate_dashboard_cache(user.id)
             return recipe
 
     @classmethod
@@ -62,6 +64,7 @@ class RecipeService:
 
                 instance.refresh_from_db()
                 instance.calculate_cost()
+            invalidate_dashboard_cache(instance.created_by_id)
             return instance
 
     @staticmethod
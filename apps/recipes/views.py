@@ -1,5 +1,6 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
+from ..dashboard.utils import invalidate_dashboard_cache
 from .serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
@@ -39,6 +40,11 @@ class RecipeViewset(ModelViewSet):
             return RecipeDetailSerializer
         return super().get_serializer_class()
 
+    def perform_destroy(self, instance):
+        # Deleting a recipe removes its order lines too
+        invalidate_dashboard_cache(instance.created_by_id)
+        super().perform_destroy(instance)
+
 
 class RecipeCategoryViewset(ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,33 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .utils import start_request_preferences, end_request_preferences
+
+
+class RequestPreferencesMiddleware:
+    """
+    Memoize preference lookups for the lifetime of each request, so
+    serializing many rows reads the user's preferences once.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = start_request_preferences()
+        try:
+            return self.get_response(request)
+        finally:
+            end_request_preferences(token)
+
+    async def __acall__(self, request):
+        token = start_request_preferences()
+        try:
+            return await self.get_response(request)
+        finally:
+            end_request_preferences(token)
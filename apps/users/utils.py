@@ -1,35 +1,148 @@
+import threading
+from contextvars import ContextVar
+from cachetools import TTLCache
 from django.conf import settings
 from django.core.cache import cache
+from .models import UserPreferences
+from .serializers import UserPreferencesSerializer
 
-def get_preferences_cache_key(user_id, version=settings.REST_FRAMEWORK["DEFAULT_VERSION"]):
+# Preferences already looked up during the current request, by user id
+_request_preferences = ContextVar("request_preferences", default=None)
+
+# Per-process tier in front of the shared cache, keyed by (user id, version).
+# The version is read from the shared cache on every lookup, so an update
+# made by any process retires these entries at once.
+_local_preferences = TTLCache(
+    maxsize=settings.PREFERENCES_LOCAL_CACHE_SIZE,
+    ttl=settings.PREFERENCES_LOCAL_CACHE_TTL,
+)
+_local_lock = threading.Lock()
+
+
+def _user_id(user):
+    """Accept either a user or a user id, so every tier is keyed the same way"""
+    return str(getattr(user, "pk", user))
+
+
+def get_preferences_version_key(user_id):
+    return f"user_preferences_version_{user_id}"
+
+
+def get_preferences_version(user_id):
+    """
+    The user's current preferences version. Cached preferences are keyed by
+    it, so bumping it retires them everywhere at once.
+    """
+    key = get_preferences_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_preferences_cache_key(user_id, version=None):
     """
     Generate a cache key for user preferences based on user ID.
-    
+
     Args:
         user_id (uuid): The ID of the user.
-        action (str): The action type, default is "detail".
-    
+        version (int): The preferences version, the current one by default.
+
     Returns:
         str: A cache key formatted as 'user_preferences_<user_id>_<version>'.
     """
-    return f'user_preferences_{user_id}_{version}'
+    if version is None:
+        version = get_preferences_version(user_id)
+    return f"user_preferences_{user_id}_{version}"
 
 
-def get_user_preferrence_from_cache(user_id, preference_type, default):
+def get_user_preferences(user):
     """
-    Get a preferrence for a user from the cache.
+    The user's preferences as serialized by UserPreferencesSerializer, or an
+    empty dict if they have none. Looked up in the request memo, then this
+    process's cache under the current version, then the shared cache and
+    only then the database.
 
     Args:
-        user_id (uuid): The ID of the user.
+        user: A user or a user ID.
+    """
+    user_id = _user_id(user)
+
+    memo = _request_preferences.get()
+    if memo is not None and user_id in memo:
+        return memo[user_id]
+
+    version = get_preferences_version(user_id)
+    with _local_lock:
+        preferences = _local_preferences.get((user_id, version))
+
+    if preferences is None:
+        cache_key = get_preferences_cache_key(user_id, version)
+        preferences = cache.get(cache_key)
+        if preferences is None:
+            preferences = _load_preferences(user_id)
+            cache.set(cache_key, preferences, timeout=settings.CACHE_TIMEOUT)
+        with _local_lock:
+            _local_preferences[(user_id, version)] = preferences
+
+    if memo is not None:
+        memo[user_id] = preferences
+    return preferences
+
+
+def _load_preferences(user_id):
+    instance = UserPreferences.objects.filter(user_id=user_id).first()
+    if instance is None:
+        return {}
+    return dict(UserPreferencesSerializer(instance).data)
+
+
+def set_user_preferences(user, preferences):
+    """
+    Retire the user's cached preferences by moving to a new version and
+    store `preferences` under it. Call after the preferences change.
+    """
+    user_id = _user_id(user)
+    key = get_preferences_version_key(user_id)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    preferences = dict(preferences)
+    cache.set(
+        get_preferences_cache_key(user_id, version),
+        preferences,
+        timeout=settings.CACHE_TIMEOUT,
+    )
+    with _local_lock:
+        _local_preferences[(user_id, version)] = preferences
+    memo = _request_preferences.get()
+    if memo is not None:
+        memo[user_id] = preferences
+
+
+def get_user_preferrence_from_cache(user, preference_type, default):
+    """
+    Get a preferrence for a user, loading the user's preferences on a miss.
+
+    Args:
+        user: A user or a user ID.
         preference_type (str): The type of preference to retrieve, e.g., "currency".
-    
+        default: Returned when the preference is not set.
+
     Returns:
-        str: The preferred currency of the user, or None if not set.
+        The preference value, or `default` if not set.
     """
-    cache_key = get_preferences_cache_key(user_id)
-    preferences = cache.get(cache_key)
-    if preferences is None:
-        return default
-    return preferences.get(preference_type, default)
+    value = get_user_preferences(user).get(preference_type)
+    return default if value is None else value
+
+
+def start_request_preferences():
+    """Begin memoizing preference lookups; returns the token to end it with"""
+    return _request_preferences.set({})
+
 
-    
\ No newline at end of file
+def end_request_preferences(token):
+    _request_preferences.reset(token)
@@ -1,8 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
@@ -22,7 +21,7 @@ from .serializers import (
     UserPreferencesSerializer,
     UserPreferences,
 )
-from .utils import get_preferences_cache_key
+from .utils import get_user_preferences, set_user_preferences
 import requests
 import environ
 import logging
@@ -168,24 +167,14 @@ class UserPreferencesView(RetrieveUpdateAPIView):
             return UserPreferences.objects.filter(user=user)
 
     def retrieve(self, request, *args, **kwargs):
-        cache_key = get_preferences_cache_key(request.user.id)
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data, status=status.HTTP_200_OK)
-
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-
-        cache.set(cache_key, data, timeout=settings.CACHE_TIMEOUT)
-        return Response(data, status=status.HTTP_200_OK)
+        preferences = get_user_preferences(request.user.id)
+        if not preferences:
+            raise NotFound("Preferences have not been set.")
+        return Response(preferences, status=status.HTTP_200_OK)
 
     def update(self, request, *args, **kwargs):
-        cache_key = get_preferences_cache_key(request.user.id)
-        cache.delete(cache_key)  # Invalidate cache on update
-
         response = super().update(request, *args, **kwargs)
         if response.status_code == status.HTTP_200_OK:
-            cache.set(cache_key, response.data, timeout=settings.CACHE_TIMEOUT)
+            # A new version retires the cached preferences in every process
+            set_user_preferences(request.user.id, response.data)
         return response
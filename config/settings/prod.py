@@ -82,6 +82,7 @@ LOCAL_APPS = [
     "apps.notifications.apps.NotificationsConfig",
     "apps.dashboard.apps.DashboardConfig",
     "apps.analytics.apps.AnalyticsConfig",
+    "apps.jobs.apps.JobsConfig",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -98,6 +99,7 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "apps.notifications.middleware.NotificationHeaderMiddleware",
+    "apps.users.middleware.RequestPreferencesMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -366,6 +368,49 @@ CACHES = {
     }
 }
 
+# User preferences
+# Each process keeps recently used preferences; updates retire them through a shared version
+PREFERENCES_LOCAL_CACHE_TTL = env.int("PREFERENCES_LOCAL_CACHE_TTL", default=30)  # seconds # type: ignore
+PREFERENCES_LOCAL_CACHE_SIZE = env.int("PREFERENCES_LOCAL_CACHE_SIZE", default=1024)  # type: ignore
+
+# Dashboard
+# Cached payloads are also retired whenever the user's orders, stock or recipes change
+DASHBOARD_CACHE_TIMEOUT = env.int("DASHBOARD_CACHE_TIMEOUT", default=300)  # seconds # type: ignore
+DASHBOARD_CACHE_LOCK_TIMEOUT = env.int("DASHBOARD_CACHE_LOCK_TIMEOUT", default=10)  # seconds # type: ignore
+
+# Notifications
+# The unread counter is adjusted in place as notifications are created and read
+NOTIFICATION_COUNT_CACHE_TIMEOUT = env.int("NOTIFICATION_COUNT_CACHE_TIMEOUT", default=86400)  # seconds # type: ignore
+# New notifications are pushed to streams through "redis" pub/sub, or "local" within one process
+NOTIFICATION_BROKER = env("NOTIFICATION_BROKER", default="redis")  # type: ignore
+NOTIFICATION_STREAM_KEEPALIVE = env.int("NOTIFICATION_STREAM_KEEPALIVE", default=15)  # seconds # type: ignore
+# Streams are opened with a single-use ticket, since EventSource cannot send the access token
+NOTIFICATION_STREAM_TICKET_TTL = env.int("NOTIFICATION_STREAM_TICKET_TTL", default=30)  # seconds # type: ignore
+# Unread notifications of the same type for the same object within this window are folded into one
+NOTIFICATION_COALESCE_WINDOW = env.int("NOTIFICATION_COALESCE_WINDOW", default=86400)  # seconds # type: ignore
+# Notifications older than this are purged daily, per type
+NOTIFICATION_RETENTION_DAYS = {
+    "REORDER_CHECK": env.int("NOTIFICATION_RETENTION_REORDER_CHECK", default=30),  # type: ignore
+    "DELIVERY_REMINDER": env.int("NOTIFICATION_RETENTION_DELIVERY_REMINDER", default=14),  # type: ignore
+}
+NOTIFICATION_PURGE_CHUNK_SIZE = env.int("NOTIFICATION_PURGE_CHUNK_SIZE", default=1000)  # type: ignore
+
+# Background jobs
+# Processed by `python manage.py run_jobs`
+JOBS_BATCH_SIZE = env.int("JOBS_BATCH_SIZE", default=100)  # type: ignore
+JOBS_POLL_INTERVAL = env.float("JOBS_POLL_INTERVAL", default=1.0)  # type: ignore
+JOBS_MAX_ATTEMPTS = env.int("JOBS_MAX_ATTEMPTS", default=5)  # type: ignore
+JOBS_RETRY_DELAY = env.int("JOBS_RETRY_DELAY", default=30)  # seconds, doubled per attempt # type: ignore
+JOBS_STALE_AFTER = env.int("JOBS_STALE_AFTER", default=600)  # seconds # type: ignore
+# Daily tasks are run by `python manage.py run_scheduler`
+SCHEDULER_POLL_INTERVAL = env.float("SCHEDULER_POLL_INTERVAL", default=60.0)  # seconds # type: ignore
+
+# Stock ledger
+# Conflicting stock writes are planned again on fresh rows this many times
+STOCK_LEDGER_MAX_ATTEMPTS = env.int("STOCK_LEDGER_MAX_ATTEMPTS", default=5)  # type: ignore
+# Completions wait this long so reorder checks for the same user are merged
+REORDER_CHECK_DELAY = env.int("REORDER_CHECK_DELAY", default=60)  # seconds # type: ignore
+
 
 # SECURITY
 # ------------------------------------------------------------------------------